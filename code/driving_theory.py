@@ -1,648 +1,5421 @@
 # Initial Config
-import spacy
-
-spacy.load("en_core_web_sm")
-from spacy.lang.en import English
-
-parser = English()
-
-import nltk
-
-nltk.download("wordnet")
-from nltk.corpus import wordnet as wn
-from nltk.stem.wordnet import WordNetLemmatizer
-
 import os
+import json
+import hashlib
+import importlib
+import string
 import unicodedata
 
 import requests
 import urllib
-import pandas as pd
 import numpy as np
-import cv2
-from requests_html import HTML
-from requests_html import HTMLSession
 import random
-from bs4 import BeautifulSoup
-from IPython.display import Image, HTML, clear_output
+import heapq
+import functools
+import sqlite3
+from collections import Counter, OrderedDict, deque
+import threading
+import time
+from io import BytesIO
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+import multiprocessing
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from PIL import Image, ImageChops, ImageStat
-from skimage import io
 import re
-from datetime import date
+from html.parser import HTMLParser
+import asyncio
+from datetime import date, datetime
 import logging
 
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-
 
-# Classes
-class AnswerSearch:
+class LazyImport:
     """
-    Class searches for the answer to the multiple-choice question by utilising
-    Google and retrieving an answer in the form of the first description available.
+    Class stands in for a module, or an attribute of a module, and only imports it the
+    first time it is used. Keeps importing this module fast, as the heavy dependencies
+    and language resources are loaded by the classes that need them.
 
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, module_name: str, attribute: str = None):
+        self.module_name = module_name
+        self.attribute = attribute
+        self.target = None
 
-    def get_source(self, url: str):
+    def import_target(self):
         """
-        Creates a HTML session by retrieving a response from the URL.
-        If the retrieval is successful, a response 200 will be returned.
-
-        Parameters
-        ----------
-        url: str, the URL param.
+        Imports the module, if it has not been imported yet.
 
         Returns
         -------
-        A response with a relevant code.
+        The module, or the attribute of the module.
 
         """
-        try:
-            session = HTMLSession()
-            response = session.get(url)
-            return response
+        if self.target is None:
+            target = importlib.import_module(self.module_name)
+            if self.attribute is not None:
+                target = getattr(target, self.attribute)
+            self.target = target
+
+        return self.target
+
+    def __getattr__(self, name: str):
+        return getattr(self.import_target(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self.import_target()(*args, **kwargs)
+
+
+nltk = LazyImport("nltk")
+wn = LazyImport("nltk.corpus", "wordnet")
+WordNetLemmatizer = LazyImport("nltk.stem.wordnet", "WordNetLemmatizer")
+spacy = LazyImport("spacy")
+English = LazyImport("spacy.lang.en", "English")
+pd = LazyImport("pandas")
+cv2 = LazyImport("cv2")
+BeautifulSoup = LazyImport("bs4", "BeautifulSoup")
+RequestsHTML = LazyImport("requests_html", "HTML")
+HTML = LazyImport("IPython.display", "HTML")
+linear_sum_assignment = LazyImport("scipy.optimize", "linear_sum_assignment")
+webdriver = LazyImport("selenium.webdriver")
+WebDriverWait = LazyImport("selenium.webdriver.support.ui", "WebDriverWait")
+EC = LazyImport("selenium.webdriver.support.expected_conditions")
+By = LazyImport("selenium.webdriver.common.by", "By")
+
+SIGN_BANK_VERSION = 1
+# The most a test image may score against a sign in the bank to be given its caption.
+# Scores are taken on the canonical size of the bank rather than on the size of the
+# test image, as the func image_comparison did; on sign images the two scores differ
+# by about 1% and give the same captions at this threshold. Images with detail finer
+# than the canonical size, eg noise, score differently, so the func check_threshold
+# of the SignBank class checks the threshold against a bank, eg with build-bank
+SIGN_MATCH_THRESHOLD = 10
+# The most seconds a saved HighwayCodeIndex is used for before the Highway Code is
+# indexed again; the rules change a few times a year at most
+KNOWLEDGE_BASE_MAX_AGE = 30 * 24 * 60 * 60
+
+image_fetcher = None
+sign_banks = OrderedDict()
+sign_banks_lock = threading.Lock()
+text_pipeline = None
+text_pipeline_lock = threading.Lock()
+semantic_ranker = None
+batch_solver = None
+search_client = None
+http_cache = None
+latency_tracker = None
+circuit_breakers = {}
+rate_limiters = {}
+host_guard_lock = threading.Lock()
+# The (rate per second, capacity) of the token bucket of each host; None is the default
+RATE_LIMITS = {
+    "www.google.co.uk": (1.0, 5),
+    "www.google.com": (1.0, 5),
+    None: (10.0, 20),
+}
+
+
+# Functions
+def warmup(background: bool = False):
+    """
+    Loads the heavy dependencies and language resources up front, rather than the
+    first time a class needs them. Useful for long-running processes.
 
-        except requests.exceptions.RequestException as e:
-            print(e)
+    Parameters
+    ----------
+    background: bool, if True, loads them in a daemon thread and returns straight away.
 
-    def get_results(self, query: str):
-        """
-        Uses the func get_source to return the results of the google search
-        based on the query param.
-        Parameters
-        ----------
-        query: str, the query to be searched.
+    Returns
+    -------
+    The thread doing the loading if background is True, else None.
 
-        Returns
-        -------
-        A response with a relevant code. If it is 200, then the retrieval
-        is successful.
+    """
+    def load():
+        for module in [nltk, wn, English, pd, cv2, BeautifulSoup, HTML]:
+            module.import_target()
+        for module in [linear_sum_assignment, webdriver, WebDriverWait, EC, By]:
+            module.import_target()
 
-        """
+        # Load the stopwords, wordnet and the tokenizer
+        shared_text_pipeline().prepare("Loading the language resources")
 
-        query = urllib.parse.quote_plus(query)
-        response = AnswerSearch().get_source(
-            "https://www.google.co.uk/search?q=" + query
-        )
+    if background:
+        thread = threading.Thread(target=load, name="driving_theory_warmup", daemon=True)
+        thread.start()
+        return thread
+
+    load()
 
-        return response
 
-    def answer_search(self, question: str) -> str:
+# Classes
+class LatencyTracker:
+    """
+    Class keeps the most recent latencies of each source, eg each host, and reports
+    their percentiles. The p90 is used as the hedge delay of the SearchClient, so
+    that it adapts to how each source is performing.
+
+    """
+
+    def __init__(self, window: int = 256, min_samples: int = 10, default: float = 1.0):
+        self.window = window
+        self.min_samples = min_samples
+        self.default = default
+        self.latencies = {}
+        self.lock = threading.Lock()
+
+    def record(self, source: str, seconds: float):
         """
-        Searches for an answer to a question based on a Google search.
+        Records the latency of a request to a source.
 
         Parameters
         ----------
-        question: str, the initial question input.
+        source: str, the source, eg the host of the url.
+        seconds: float, how long the request took.
 
         Returns
         -------
-        A string with the answer to the question.
 
         """
-        response = AnswerSearch().get_results(question)
-        css_identifier_text = ".hgKElc"
-        results = response.html.find(css_identifier_text)
+        with self.lock:
+            if source not in self.latencies:
+                self.latencies[source] = deque(maxlen=self.window)
+            self.latencies[source].append(seconds)
 
-        return results[0].find(css_identifier_text, first=True).text
-
-
-class ImageDetection:
-    """
-    Class attempts to detect an image in a multiple choice question.
-
-    """
-
-    def __init__(self):
-        pass
-
-    def detect_image_question(self, driver, image_xpath: str):
+    def percentile(self, source: str, q: float):
         """
-        Assesses whether an image is present on the given xpath.
+        Returns a percentile of the recent latencies of a source.
 
         Parameters
         ----------
-        driver: the selenium driver used to open the webpage and start the test.
-        image_xpath: str, the xpath of the image to look for.
+        source: str, the source.
+        q: float, the percentile, between 0 and 100.
 
         Returns
         -------
-        A bool and the body of the image, if present on the page.
+        A float with the latency in seconds, or None if there are no latencies yet.
 
         """
-        outcome = False
-        image_body = ""
-        # Determine if the image body is present on the page
-        try:
-            image_body = driver.find_element_by_xpath(image_xpath)
-            outcome = True
-        except Exception as e:
-            print(e)
+        with self.lock:
+            latencies = list(self.latencies.get(source, ()))
+        if not latencies:
+            return None
 
-        return outcome, image_body
+        return float(np.percentile(latencies, q))
 
-    def get_image_url(self, image_body) -> str:
+    def hedge_delay(self, source: str, q: float = 90) -> float:
         """
-        Returns the url of the image if present on the page. Image body is created
-        from the func detect_image.
+        Returns how long to wait for a request to a source before hedging it; the
+        p90 of its recent latencies, or the default until there are enough of them.
 
         Parameters
         ----------
-        image_body: the selenium webdriver WebElement, generated from the detect_image func.
+        source: str, the source.
+        q: float, the percentile to wait for.
 
         Returns
         -------
-        The url of the image.
+        A float with the delay in seconds.
 
         """
-        return image_body.get_attribute("src")
+        with self.lock:
+            count = len(self.latencies.get(source, ()))
+        if count < self.min_samples:
+            return self.default
 
-    def detect_image_answers(self, driver, image_answers_class_name: str):
-        """
-        Detects whether the answers themselves are images.
+        return self.percentile(source=source, q=q)
 
-        Parameters
-        ----------
-        driver: the selenium driver used to open the webpage and start the test.
-        image_answers_class_name: str, the class name of the image answers.
+    def stats(self) -> dict:
+        """
+        Returns the p50, p95 and p99 latencies of every source.
 
         Returns
         -------
-        A list of image urls of the answers.
+        A dict of the sources and a dict of their statistics.
 
         """
-        # Returns a list of images
-        image_body = driver.find_elements_by_class_name(image_answers_class_name)
+        with self.lock:
+            sources = {
+                source: list(latencies) for source, latencies in self.latencies.items()
+            }
+
+        return {
+            source: {
+                "count": len(latencies),
+                "p50": float(np.percentile(latencies, 50)),
+                "p95": float(np.percentile(latencies, 95)),
+                "p99": float(np.percentile(latencies, 99)),
+            }
+            for source, latencies in sources.items()
+            if latencies
+        }
 
-        # Image urls
-        image_urls = []
-        for body in image_body:
-            image_url = ImageDetection().get_image_url(image_body=body)
-            image_urls.append(image_url)
 
-        return image_urls
+def shared_latency_tracker() -> LatencyTracker:
+    """
+    Returns the LatencyTracker shared by the module, making it the first time it is
+    asked for.
 
+    Returns
+    -------
+    A LatencyTracker.
 
-class ImageSearch:
     """
-    In the event that a pictorial question is asked ('What is this sign?'); class attempts to
-    search the image using its URL and a different tab to the one already being used
-    for the test.
+    global latency_tracker
+
+    if latency_tracker is None:
+        latency_tracker = LatencyTracker()
+
+    return latency_tracker
 
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
     """
+    Raised instead of making a request to a host whose circuit breaker is open.
 
-    def __init__(self):
-        pass
+    """
 
-    def new_tab(self, driver):
+
+class CircuitBreaker:
+    """
+    Class stops requests to a host that is failing, so that each call fails at once
+    rather than slowly. The breaker opens after a run of consecutive failures or
+    slow calls, and after reset_timeout seconds lets a single trial call through;
+    the breaker closes if it succeeds and opens again if it does not.
+
+    """
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 5.0,
+        reset_timeout: float = 30.0,
+    ):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def transition(self, state: str):
         """
-        Opens a new tab on an already existing webdriver.
+        Moves the breaker to a new state and logs the transition. Called with the
+        lock held.
+
         Parameters
         ----------
-        driver: the selenium driver used to open the webpage and start the test.
+        state: str, 'closed', 'open' or 'half_open'.
 
         Returns
         -------
-        A new tab being opened on the webpage opened.
 
         """
-        driver.execute_script("window.open('','_blank');")
+        if state != self.state:
+            logging.warning(
+                f"Circuit breaker for {self.host}: {self.state} -> {state}"
+            )
+        self.state = state
+        if state == "open":
+            self.opened_at = time.monotonic()
+        if state == "closed":
+            self.failures = 0
 
-    def switch_tab(self, driver):
+    def is_open(self) -> bool:
         """
-        Switches the tab of the driver.
-
-        Parameters
-        ----------
-        driver: the selenium driver used to open the webpage and start the test.
+        Checks whether calls to the host should go to a local fallback, without
+        taking the trial call of a half open breaker.
 
         Returns
         -------
-        The control being passed to the tab just opened using the new_tab func.
+        A bool, True if the breaker is open and not yet due a trial call.
 
         """
-        window_handles = driver.window_handles
-
-        driver.switch_to_window(window_handles[-1])
+        with self.lock:
+            return (
+                self.state == "open"
+                and time.monotonic() - self.opened_at < self.reset_timeout
+            ) or (self.state == "half_open" and self.trial_in_flight)
 
-    def switch_to_original_tab(self, driver):
+    def allow(self) -> bool:
         """
-        Switches back control to the original tab of the driver.
-
-        Parameters
-        ----------
-        driver: the selenium driver used to open the webpage and start the test.
+        Checks whether a call to the host may be made. Every call that is allowed
+        must be followed by the func record_success or record_failure.
 
         Returns
         -------
-        Control being switched over to the original tab to carry on the test.
+        A bool, True if the call may be made.
 
         """
-        window_handles = driver.window_handles
+        with self.lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.transition("half_open")
+            if self.state == "half_open":
+                if self.trial_in_flight:
+                    return False
+                self.trial_in_flight = True
 
-        driver.switch_to_window(window_handles[0])
+            return True
 
-    def accept_google_search_cookies(
-        self, driver, accept_button_xpath: str, wait_time: int
-    ):
+    def record_success(self, seconds: float = 0.0):
         """
-        Accepts the cookies on Google search.
+        Records a call that succeeded. A call slower than slow_call_seconds counts as
+        a failure, as a host that is rate limiting often answers slowly first.
 
         Parameters
         ----------
-        driver: the selenium driver used to open the webpage and start the test.
-        accept_button_xpath: str, the xpath of the accept button.
-        wait_time: int, the time (in seconds) to wait
+        seconds: float, how long the call took.
 
         Returns
         -------
-        Accepts the cookies on Google search and allows you to continue
-        with the search.
 
         """
+        if seconds > self.slow_call_seconds:
+            self.record_failure()
+            return
 
-        buddy = WebDriverWait(driver, wait_time).until(
-            EC.visibility_of_element_located((By.XPATH, accept_button_xpath))
-        )
-        buddy.click()
+        with self.lock:
+            self.trial_in_flight = False
+            self.failures = 0
+            if self.state == "half_open":
+                self.transition("closed")
 
-    def close_tab(self, driver):
+    def release(self):
         """
-        Closes the tab of the current driver.
-
-        Parameters
-        ----------
-        driver: the selenium driver used to open the webpage and start the test.
+        Ends a call that was allowed without recording whether it succeeded, eg if
+        it was interrupted, so a half open breaker can let another trial call
+        through.
 
         Returns
         -------
-        The tab being closed.
 
         """
-        return driver.close()
+        with self.lock:
+            self.trial_in_flight = False
 
-    def image_search(
-        self,
-        driver,
-        image_url_path: str,
-        cam_button_xpath: str,
-        url_tab_xpath: str,
-        image_url_id: str,
-        search_button_id: str,
-        first_answer_xpath: str,
-    ) -> str:
+    def record_failure(self):
         """
-        Conducts an image search on Google images based on the image_url_path param.
-        Once searches are made, it returns the first answer.
-
-        Parameters
-        ----------
-        driver: the selenium driver used to open the webpage and start the test.
-        image_url_path: str, the url of the image to be searched.
-        cam_button_xpath: str, the xpath of the camera icon button.
-        url_tab_xpath: str, the xpath of the url tab.
-        image_url_id: str, the id of the image url input.
-        search_button_id: str, the id of the search button to be clicked.
-        first_answer_xpath: str, the xpath of the first answer.
+        Records a call that failed, opening the breaker if it is the trial call or
+        the last of failure_threshold consecutive failures.
 
         Returns
         -------
-        An answer to what the image could be according to Google image search.
 
         """
-        # Open Google Image search in the other tab
-        driver.get("https://www.google.com/imghp?hl=EN")
-
-        # Find cam button
-        cam_button = driver.find_element_by_xpath(cam_button_xpath)
-        cam_button.click()
-
-        # Find image url tab
-        url_tab = driver.find_element_by_xpath(url_tab_xpath)
-        url_tab.click()
-
-        # Set the image url
-        image_url = driver.find_element_by_id(image_url_id)
-        image_url.clear()
-        image_url.send_keys(image_url_path)
-
-        # Click on the search button
-        submit_button = driver.find_element_by_id(search_button_id)
-        submit_button.click()
-
-        # Identify the answer
-        answer = driver.find_element_by_xpath(first_answer_xpath)
-
-        return answer.text
+        with self.lock:
+            self.trial_in_flight = False
+            self.failures += 1
+            if self.state == "half_open" or (
+                self.state == "closed" and self.failures >= self.failure_threshold
+            ):
+                self.transition("open")
 
 
-class ImageComparison:
+class TokenBucket:
     """
-    Class compares an image compared to an image bank and determines its caption.
-    Best suited for questions related to identify Highway Code signs.
+    Class is a token bucket rate limiter. Tokens are added at rate per second up to
+    capacity, so bursts of up to capacity requests are allowed while the average
+    stays at rate. It is thread safe, so one bucket can be shared by every worker
+    thread in a process.
 
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
 
-    def make_highway_code_image_bank(self, url: str) -> HTML:
+    def acquire(self, tokens: float = 1, timeout: float = None) -> bool:
         """
-        Makes a bank of images from the highway code.
+        Takes tokens from the bucket, waiting until there are enough.
 
         Parameters
         ----------
-        url: str, the url to be accessed.
+        tokens: float, the number of tokens to take.
+        timeout: float, the most seconds to wait, if limited.
 
         Returns
         -------
-        A dataframe with images and their captions
+        A bool, True if the tokens were taken, False if the timeout ran out.
 
         """
-        # Parse the page and put it into BeautifulSoup
-        html_page = requests.get(url)
-        soup = BeautifulSoup(html_page.content, "html.parser")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+def host_circuit_breaker(host: str) -> CircuitBreaker:
+    """
+    Returns the CircuitBreaker of a host, shared by the module, making it the first
+    time it is asked for.
 
-        images = soup.find_all("img")
+    Parameters
+    ----------
+    host: str, the host.
 
-        df_list = []
-        for image in images:
-            # Retrieve the caption and the image url
-            image_url = image.attrs["src"]
-            img_src = f'<img src="{image_url}"/>'
-            caption = image.attrs["alt"]
+    Returns
+    -------
+    A CircuitBreaker.
 
-            # Put the caption and image into a row
-            row_1 = [img_src, caption]
+    """
+    with host_guard_lock:
+        if host not in circuit_breakers:
+            circuit_breakers[host] = CircuitBreaker(host=host)
 
-            # Put the row into the dataframe and transpose it
-            df = pd.DataFrame(row_1).transpose()
+        return circuit_breakers[host]
 
-            # Give the dataframe some columns
-            df.columns = ["Image", "Caption"]
 
-            # Append the df to the df_list
-            df_list.append(df)
+def host_rate_limiter(host: str) -> TokenBucket:
+    """
+    Returns the TokenBucket of a host, shared by the module, making it the first
+    time it is asked for. The rate and capacity come from RATE_LIMITS, or its
+    default entry.
 
-        all_images_df = pd.concat(df_list)
+    Parameters
+    ----------
+    host: str, the host.
 
-        return HTML(all_images_df.to_html(escape=False))
+    Returns
+    -------
+    A TokenBucket.
 
-    def make_highway_code_image_dict(self, url: str) -> dict:
-        """
-        Makes a dictionary of image urls and their relevant captions.
+    """
+    with host_guard_lock:
+        if host not in rate_limiters:
+            rate, capacity = RATE_LIMITS.get(host, RATE_LIMITS[None])
+            rate_limiters[host] = TokenBucket(rate=rate, capacity=capacity)
 
-        Parameters
-        ----------
-        url: str, the url to be accessed.
+        return rate_limiters[host]
 
-        Returns
-        -------
 
-        """
-        # Parse the page and put it into BeautifulSoup
-        html_page = requests.get(url)
-        soup = BeautifulSoup(html_page.content, "html.parser")
+def counts_as_failure(response: requests.Response) -> bool:
+    """
+    Checks whether a response counts as a failure of its host: rate limiting, or a
+    consent page instead of the page asked for. Such a response must not be cached.
 
-        images = soup.find_all("img")
+    Parameters
+    ----------
+    response: requests.Response, the response.
 
-        image_urls = []
-        captions = []
+    Returns
+    -------
+    A bool, True if the response is a failure.
 
-        for image in images:
+    """
+    final_host = urllib.parse.urlsplit(response.url).hostname or ""
+
+    return response.status_code in (429, 503) or final_host.startswith("consent.")
+
+
+class GuardedSession(requests.Session):
+    """
+    Class is a requests session that guards every request with the circuit breaker
+    and the rate limiter of its host, and records its latency. Rate limiting, a
+    consent page instead of the page asked for, or an error count as failures.
+
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        host = urllib.parse.urlsplit(url).hostname
+        breaker = host_circuit_breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(f"The circuit breaker for {host} is open")
+
+        recorded = False
+        try:
+            host_rate_limiter(host).acquire()
+            start = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except requests.exceptions.RequestException:
+                recorded = True
+                breaker.record_failure()
+                raise
+            seconds = time.perf_counter() - start
+            shared_latency_tracker().record(source=host, seconds=seconds)
+
+            recorded = True
+            if counts_as_failure(response):
+                breaker.record_failure()
+            else:
+                breaker.record_success(seconds=seconds)
+        finally:
+            # Any other exception must not leave a half open breaker waiting for a
+            # trial call that never finishes
+            if not recorded:
+                breaker.release()
+
+        return response
+
+
+class AnswerSearch:
+    """
+    Class searches for the answer to the multiple-choice question by utilising
+    Google and retrieving an answer in the form of the first description available.
+
+    """
+
+    def __init__(self):
+        pass
+
+    def get_source(self, url: str):
+        """
+        Retrieves a response from the URL, over the connection pool of the shared
+        SearchClient and with its timeouts.
+
+        Parameters
+        ----------
+        url: str, the URL param.
+
+        Returns
+        -------
+        A response with a successful status code.
+
+        Raises
+        ------
+        requests.exceptions.RequestException, if the request fails or times out.
+
+        """
+        try:
+            return shared_search_client().get(url)
+        except requests.exceptions.RequestException as e:
+            logging.info(f"Could not retrieve {url}: {e}")
+            raise
+
+    def get_results(self, query: str):
+        """
+        Uses the func get_source to return the results of the google search
+        based on the query param.
+        Parameters
+        ----------
+        query: str, the query to be searched.
+
+        Returns
+        -------
+        A response with a relevant code. If it is 200, then the retrieval
+        is successful.
+
+        """
+
+        query = urllib.parse.quote_plus(query)
+        response = AnswerSearch().get_source(
+            "https://www.google.co.uk/search?q=" + query
+        )
+
+        return response
+
+    def answer_search(self, question: str, budget: float = None) -> str:
+        """
+        Searches for an answer to a question based on Google searches for several
+        reformulations of it, hedged with the func search_async of the SearchClient
+        class.
+
+        Parameters
+        ----------
+        question: str, the initial question input.
+        budget: float, the most seconds to spend on the search, if limited.
+
+        Returns
+        -------
+        A string with the answer to the question.
+
+        Raises
+        ------
+        LookupError, if none of the searches found an answer.
+        CircuitOpenError, if the circuit breaker of the search host is open.
+
+        """
+        # Go straight to the local fallbacks while the search host is failing
+        host = urllib.parse.urlsplit(shared_search_client().search_url).hostname
+        if host_circuit_breaker(host).is_open():
+            raise CircuitOpenError(f"The circuit breaker for {host} is open")
+
+        answer = shared_search_client().search(question, budget=budget)
+        if answer is None:
+            raise LookupError(f"No answer found for the question: {question}")
+
+        return answer
+
+
+class SnippetExtractor(HTMLParser):
+    """
+    Class extracts the answer snippet from a page of search results without building
+    a DOM. The page is tokenised in chunks, only the text inside an element that
+    matches one of the selectors is kept, and parsing stops as soon as the element
+    of the first selector has closed. The selectors are tried in order, for the
+    different layouts of answer box.
+
+    """
+
+    SELECTORS = [".hgKElc", ".IZ6rdc", ".Z0LcW", ".LGOjhe", ".kno-rdesc"]
+    VOID_ELEMENTS = frozenset(
+        "area base br col embed hr img input link meta param source track wbr".split()
+    )
+    # Elements whose text is separated from the text around them
+    BREAK_ELEMENTS = frozenset(
+        "br p div li tr td th dt dd h1 h2 h3 h4 h5 h6 ul ol table section".split()
+    )
+
+    class Found(Exception):
+        """
+        Raised to stop parsing once the snippet of the first selector is found.
+
+        """
+
+    def __init__(self, selectors: list = None, chunk_size: int = 65536):
+        super().__init__(convert_charrefs=True)
+        self.selectors = [
+            self.parse_selector(selector)
+            for selector in (selectors or SnippetExtractor.SELECTORS)
+        ]
+        self.chunk_size = chunk_size
+        self.snippets = {}
+        # The selectors being captured, each with its open tags and text so far
+        self.captures = {}
+
+    def parse_selector(self, selector: str) -> tuple:
+        """
+        Parses a simple selector, eg 'span.hgKElc' or '#answer'.
+
+        Parameters
+        ----------
+        selector: str, a tag, classes and an id, without combinators.
+
+        Returns
+        -------
+        A tuple of the tag (or None), the set of classes and the id (or None).
+
+        """
+        parts = re.findall(r"([.#]?)([\w-]+)", selector)
+        tag = next((name for prefix, name in parts if not prefix), None)
+        classes = {name for prefix, name in parts if prefix == "."}
+        element_id = next((name for prefix, name in parts if prefix == "#"), None)
+
+        return tag, classes, element_id
+
+    def matches(self, tag: str, attrs: list) -> list:
+        """
+        Finds the selectors that an element matches, that have no snippet yet.
+
+        Parameters
+        ----------
+        tag: str, the tag of the element.
+        attrs: list, the (name, value) attributes of the element.
+
+        Returns
+        -------
+        A list of the indices of the selectors.
+
+        """
+        attrs = dict(attrs)
+        classes = set((attrs.get("class") or "").split())
+        return [
+            i
+            for i, (selector_tag, selector_classes, selector_id) in enumerate(
+                self.selectors
+            )
+            if i not in self.snippets
+            and i not in self.captures
+            and (selector_tag is None or selector_tag == tag)
+            and selector_classes <= classes
+            and (selector_id is None or selector_id == attrs.get("id"))
+        ]
+
+    def handle_starttag(self, tag: str, attrs: list):
+        if tag in SnippetExtractor.BREAK_ELEMENTS:
+            self.handle_data(" ")
+        if tag in SnippetExtractor.VOID_ELEMENTS:
+            return
+        for open_tags, _ in self.captures.values():
+            open_tags.append(tag)
+        for i in self.matches(tag, attrs):
+            self.captures[i] = ([tag], [])
+
+    def handle_startendtag(self, tag: str, attrs: list):
+        # A self-closing tag opens and closes nothing, but still separates text, eg
+        # a<br/>b
+        if tag in SnippetExtractor.BREAK_ELEMENTS:
+            self.handle_data(" ")
+
+    def handle_endtag(self, tag: str):
+        if tag in SnippetExtractor.BREAK_ELEMENTS:
+            self.handle_data(" ")
+        for i in list(self.captures):
+            open_tags, pieces = self.captures[i]
+            # Close the most recent open tag of the same name, and any left open
+            # inside it; stray end tags are ignored
+            if tag not in open_tags:
+                continue
+            del open_tags[len(open_tags) - 1 - open_tags[::-1].index(tag) :]
+            if not open_tags:
+                del self.captures[i]
+                text = " ".join("".join(pieces).split())
+                if text:
+                    self.snippets[i] = text
+                    if i == 0:
+                        raise SnippetExtractor.Found()
+
+    def handle_data(self, data: str):
+        for _, pieces in self.captures.values():
+            pieces.append(data)
+
+    def extract(self, text: str):
+        """
+        Extracts the snippet from a page, feeding it to the parser a chunk at a time.
+
+        Parameters
+        ----------
+        text: str, the html of the page.
+
+        Returns
+        -------
+        A string with the text of the snippet of the first selector that has one,
+        or None if there is none.
+
+        """
+        self.reset()
+        self.snippets = {}
+        self.captures = {}
+        try:
+            for start in range(0, len(text), self.chunk_size):
+                self.feed(text[start : start + self.chunk_size])
+            self.close()
+        except SnippetExtractor.Found:
+            pass
+
+        if not self.snippets:
+            return None
+
+        return self.snippets[min(self.snippets)]
+
+
+def benchmark_snippet_extraction(paths: list, selectors: list = None, repeat: int = 5):
+    """
+    Times the SnippetExtractor against the extraction it replaced, which parsed the
+    whole page into a requests_html DOM and selected the snippet, on saved pages of
+    search results.
+
+    Parameters
+    ----------
+    paths: list, the paths of the saved pages.
+    selectors: list, the selectors to try, by default those of the SnippetExtractor
+    class.
+    repeat: int, the number of times each page is parsed by each method.
+
+    Returns
+    -------
+    A list of dicts, one per page, with the size of the page, the best time in
+    seconds of each method, and whether both found the same snippet.
+
+    """
+    selectors = selectors or SnippetExtractor.SELECTORS
+
+    def dom_snippet(text: str):
+        html = RequestsHTML(html=text)
+        for selector in selectors:
+            element = html.find(selector, first=True)
+            if element is not None and element.text.strip():
+                return " ".join(element.text.split())
+        return None
+
+    extractor = SnippetExtractor(selectors=selectors)
+    results = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+
+        timings = {}
+        snippets = {}
+        for method, extract in [("dom", dom_snippet), ("stream", extractor.extract)]:
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                snippets[method] = extract(text)
+                best = min(best, time.perf_counter() - start)
+            timings[method] = best
+
+        results.append(
+            {
+                "path": path,
+                "bytes": len(text.encode("utf-8")),
+                "dom_seconds": timings["dom"],
+                "stream_seconds": timings["stream"],
+                "speedup": timings["dom"] / max(timings["stream"], 1e-9),
+                "same_snippet": snippets["dom"] == snippets["stream"],
+                "snippet": snippets["stream"],
+            }
+        )
+        logging.info(
+            f"{path}: {timings['dom'] * 1000:.1f}ms with requests_html, "
+            f"{timings['stream'] * 1000:.1f}ms streamed"
+        )
+
+    return results
+
+
+class SearchClient:
+    """
+    Class searches Google for the answer to a question over a persistent pool of
+    connections, so that each search does not pay for a new TLS handshake. Several
+    reformulations of the question are searched concurrently with asyncio, and the
+    first usable snippet is returned.
+
+    """
+
+    USER_AGENT = (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_12_6) AppleWebKit/603.3.8 "
+        "(KHTML, like Gecko) Version/10.1.2 Safari/603.3.8"
+    )
+
+    def __init__(
+        self,
+        search_url: str = "https://www.google.co.uk/search?q=",
+        snippet_selectors: list = None,
+        max_connections: int = 8,
+        timeout: tuple = (3.05, 10),
+        cache: "HTTPCache" = None,
+    ):
+        self.search_url = search_url
+        self.cache = cache
+        self.snippet_selectors = snippet_selectors or SnippetExtractor.SELECTORS
+        self.timeout = timeout
+        self.session = GuardedSession()
+        self.session.headers["User-Agent"] = SearchClient.USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=max_connections, pool_maxsize=max_connections
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="search"
+        )
+
+    def get(self, url: str) -> requests.Response:
+        """
+        Gets a url over the pooled session.
+
+        Parameters
+        ----------
+        url: str, the url.
+
+        Returns
+        -------
+        The response, which has a successful status code.
+
+        Raises
+        ------
+        requests.exceptions.RequestException, if the request fails or times out.
+
+        """
+        cache = self.cache if self.cache is not None else http_cache
+        if cache is not None:
+            return cache.get(session=self.session, url=url, timeout=self.timeout)
+
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+
+        return response
+
+    def snippet(self, html: str):
+        """
+        Finds the answer snippet in a page of search results, with a
+        SnippetExtractor.
+
+        Parameters
+        ----------
+        html: str, the html of the page.
+
+        Returns
+        -------
+        A string with the text of the snippet, or None if there is none.
+
+        """
+        return SnippetExtractor(selectors=self.snippet_selectors).extract(html)
+
+    def reformulations(self, question: str) -> list:
+        """
+        Makes the queries searched for a question; the question itself, the question
+        with 'highway code' added, and its lemmatised topics.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+
+        Returns
+        -------
+        A list of the distinct queries.
+
+        """
+        queries = [
+            question,
+            question + " highway code",
+            " ".join(CorrectAnswer().prepare_text_for_lda(question)),
+        ]
+
+        return list(dict.fromkeys(query for query in queries if query.strip()))
+
+    async def search_query(self, query: str, cancelled: threading.Event = None):
+        """
+        Searches for one query, on the thread pool of the client. Cancelling the task
+        does not stop its thread, so the thread checks the cancelled param before
+        making the request, and skips it if the search is no longer wanted.
+
+        Parameters
+        ----------
+        query: str, the query.
+        cancelled: threading.Event, set once the result is no longer wanted.
+
+        Returns
+        -------
+        A string with the snippet, or None if there is none or the search was
+        cancelled before its request was made.
+
+        """
+        url = self.search_url + urllib.parse.quote_plus(query)
+
+        def get():
+            if cancelled is not None and cancelled.is_set():
+                return None
+            return self.get(url)
+
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self.executor, get)
+        if response is None:
+            return None
+
+        return self.snippet(response.text)
+
+    async def search_async(self, question: str, budget: float = None):
+        """
+        Searches for the reformulations of a question with hedging, and returns as
+        soon as one of them has a snippet. The question itself is searched first,
+        and if it has not answered within the p90 latency of the search host, the
+        next reformulation is searched alongside it, and so on; a search that fails
+        or has no snippet is hedged straight away. The other searches are cancelled
+        once one has answered, or the budget has run out.
+
+        The requests run on the thread pool of the client, as requests is not
+        async, and a thread cannot be stopped mid request. A cancelled search whose
+        thread has not started its request yet skips it, but one whose request is in
+        flight runs on until it returns or its timeout passes, holding a connection
+        of the pool, and its result is thrown away.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        budget: float, the most seconds to spend on the question, if limited.
+
+        Returns
+        -------
+        A string with the first snippet found, or None if no search found one within
+        the budget.
+
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if budget is None else loop.time() + budget
+        source = urllib.parse.urlsplit(self.search_url).hostname
+
+        # With no other reformulation, the hedge repeats the question
+        queries = self.reformulations(question)
+        if len(queries) == 1:
+            queries = queries * 2
+
+        tasks = []
+        pending = set()
+        cancelled = threading.Event()
+        try:
+            while True:
+                if len(tasks) < len(queries):
+                    task = asyncio.ensure_future(
+                        self.search_query(queries[len(tasks)], cancelled=cancelled)
+                    )
+                    tasks.append(task)
+                    pending.add(task)
+                if not pending:
+                    return None
+
+                timeout = None
+                if len(tasks) < len(queries):
+                    timeout = shared_latency_tracker().hedge_delay(source=source)
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        logging.info("The latency budget of the question ran out")
+                        return None
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        snippet = task.result()
+                    except requests.exceptions.RequestException as e:
+                        logging.info(f"A search for the question failed: {e}")
+                        continue
+                    if snippet:
+                        return snippet
+        finally:
+            # Stop the threads of the other searches from making their requests
+            cancelled.set()
+            for task in tasks:
+                task.cancel()
+
+    def search(self, question: str, budget: float = None):
+        """
+        Runs the func search_async to completion. Works whether or not the caller is
+        already running an event loop, eg in a notebook.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        budget: float, the most seconds to spend on the question, if limited.
+
+        Returns
+        -------
+        A string with the first snippet found, or None if no search found one.
+
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.search_async(question, budget))
+
+        # An event loop is already running on this thread, so run a new one on
+        # another thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(
+                asyncio.run, self.search_async(question, budget)
+            ).result()
+
+
+def shared_search_client() -> SearchClient:
+    """
+    Returns the SearchClient shared by the module, making it the first time it is
+    asked for.
+
+    Returns
+    -------
+    A SearchClient.
+
+    """
+    global search_client
+
+    if search_client is None:
+        search_client = SearchClient()
+
+    return search_client
+
+
+class ImageDetection:
+    """
+    Class attempts to detect an image in a multiple choice question.
+
+    """
+
+    def __init__(self):
+        pass
+
+    def detect_image_question(self, driver, image_xpath: str):
+        """
+        Assesses whether an image is present on the given xpath.
+
+        Parameters
+        ----------
+        driver: the selenium driver used to open the webpage and start the test.
+        image_xpath: str, the xpath of the image to look for.
+
+        Returns
+        -------
+        A bool and the body of the image, if present on the page.
+
+        """
+        outcome = False
+        image_body = ""
+        # Determine if the image body is present on the page
+        try:
+            image_body = driver.find_element_by_xpath(image_xpath)
+            outcome = True
+        except Exception as e:
+            print(e)
+
+        return outcome, image_body
+
+    def get_image_url(self, image_body) -> str:
+        """
+        Returns the url of the image if present on the page. Image body is created
+        from the func detect_image.
+
+        Parameters
+        ----------
+        image_body: the selenium webdriver WebElement, generated from the detect_image func.
+
+        Returns
+        -------
+        The url of the image.
+
+        """
+        return image_body.get_attribute("src")
+
+    def detect_image_answers(self, driver, image_answers_class_name: str):
+        """
+        Detects whether the answers themselves are images.
+
+        Parameters
+        ----------
+        driver: the selenium driver used to open the webpage and start the test.
+        image_answers_class_name: str, the class name of the image answers.
+
+        Returns
+        -------
+        A list of image urls of the answers.
+
+        """
+        # Returns a list of images
+        image_body = driver.find_elements_by_class_name(image_answers_class_name)
+
+        # Image urls
+        image_urls = []
+        for body in image_body:
+            image_url = ImageDetection().get_image_url(image_body=body)
+            image_urls.append(image_url)
+
+        # Fetch and decode the images now, so that the shape detection and image
+        # comparison that follow share them rather than fetching them again
+        shared_image_fetcher().fetch_many(urls=image_urls)
+
+        return image_urls
+
+
+class ImageSearch:
+    """
+    In the event that a pictorial question is asked ('What is this sign?'); class attempts to
+    search the image using its URL and a different tab to the one already being used
+    for the test.
+
+    """
+
+    def __init__(self):
+        pass
+
+    def new_tab(self, driver):
+        """
+        Opens a new tab on an already existing webdriver.
+        Parameters
+        ----------
+        driver: the selenium driver used to open the webpage and start the test.
+
+        Returns
+        -------
+        A new tab being opened on the webpage opened.
+
+        """
+        driver.execute_script("window.open('','_blank');")
+
+    def switch_tab(self, driver):
+        """
+        Switches the tab of the driver.
+
+        Parameters
+        ----------
+        driver: the selenium driver used to open the webpage and start the test.
+
+        Returns
+        -------
+        The control being passed to the tab just opened using the new_tab func.
+
+        """
+        window_handles = driver.window_handles
+
+        driver.switch_to_window(window_handles[-1])
+
+    def switch_to_original_tab(self, driver):
+        """
+        Switches back control to the original tab of the driver.
+
+        Parameters
+        ----------
+        driver: the selenium driver used to open the webpage and start the test.
+
+        Returns
+        -------
+        Control being switched over to the original tab to carry on the test.
+
+        """
+        window_handles = driver.window_handles
+
+        driver.switch_to_window(window_handles[0])
+
+    def accept_google_search_cookies(
+        self, driver, accept_button_xpath: str, wait_time: int
+    ):
+        """
+        Accepts the cookies on Google search.
+
+        Parameters
+        ----------
+        driver: the selenium driver used to open the webpage and start the test.
+        accept_button_xpath: str, the xpath of the accept button.
+        wait_time: int, the time (in seconds) to wait
+
+        Returns
+        -------
+        Accepts the cookies on Google search and allows you to continue
+        with the search.
+
+        """
+
+        buddy = WebDriverWait(driver, wait_time).until(
+            EC.visibility_of_element_located((By.XPATH, accept_button_xpath))
+        )
+        buddy.click()
+
+    def close_tab(self, driver):
+        """
+        Closes the tab of the current driver.
+
+        Parameters
+        ----------
+        driver: the selenium driver used to open the webpage and start the test.
+
+        Returns
+        -------
+        The tab being closed.
+
+        """
+        return driver.close()
+
+    def image_search(
+        self,
+        driver,
+        image_url_path: str,
+        cam_button_xpath: str,
+        url_tab_xpath: str,
+        image_url_id: str,
+        search_button_id: str,
+        first_answer_xpath: str,
+    ) -> str:
+        """
+        Conducts an image search on Google images based on the image_url_path param.
+        Once searches are made, it returns the first answer.
+
+        Parameters
+        ----------
+        driver: the selenium driver used to open the webpage and start the test.
+        image_url_path: str, the url of the image to be searched.
+        cam_button_xpath: str, the xpath of the camera icon button.
+        url_tab_xpath: str, the xpath of the url tab.
+        image_url_id: str, the id of the image url input.
+        search_button_id: str, the id of the search button to be clicked.
+        first_answer_xpath: str, the xpath of the first answer.
+
+        Returns
+        -------
+        An answer to what the image could be according to Google image search.
+
+        """
+        # Open Google Image search in the other tab
+        driver.get("https://www.google.com/imghp?hl=EN")
+
+        # Find cam button
+        cam_button = driver.find_element_by_xpath(cam_button_xpath)
+        cam_button.click()
+
+        # Find image url tab
+        url_tab = driver.find_element_by_xpath(url_tab_xpath)
+        url_tab.click()
+
+        # Set the image url
+        image_url = driver.find_element_by_id(image_url_id)
+        image_url.clear()
+        image_url.send_keys(image_url_path)
+
+        # Click on the search button
+        submit_button = driver.find_element_by_id(search_button_id)
+        submit_button.click()
+
+        # Identify the answer
+        answer = driver.find_element_by_xpath(first_answer_xpath)
+
+        return answer.text
+
+
+class HTTPCache:
+    """
+    Class is an on-disk cache of HTTP responses shared by every outbound request.
+    Bodies are stored once per distinct content, named by their sha256, and an SQLite
+    table maps each url to its body, its validators and when it was stored. Fresh
+    entries are served without a request; stale entries are revalidated with their
+    ETag or Last-Modified, and the least recently used entries are evicted to keep
+    the cache under its size cap. Search results change and can be swapped for a
+    consent page, so they are only kept for a few minutes, and a response redirected
+    to another host is never stored.
+
+    """
+
+    TTLS = {
+        "www.gov.uk": 24 * 3600,
+        "assets.publishing.service.gov.uk": 30 * 24 * 3600,
+        "www.google.co.uk": 10 * 60,
+        "www.google.com": 10 * 60,
+    }
+
+    def __init__(
+        self,
+        path: str = "http_cache",
+        max_bytes: int = 256 * 1024 * 1024,
+        ttls: dict = None,
+        default_ttl: float = 3600,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(HTTPCache.TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        os.makedirs(os.path.join(path, "objects"), exist_ok=True)
+
+        # The cache can be shared by several processes, eg the workers of the func
+        # solve_batch
+        self.connection = sqlite3.connect(
+            os.path.join(path, "index.db"), timeout=30, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "url TEXT PRIMARY KEY, digest TEXT, etag TEXT, last_modified TEXT, "
+            "content_type TEXT, stored REAL, accessed REAL, size INTEGER)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self.connection.commit()
+
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def ttl(self, url: str) -> float:
+        """
+        Returns how long a response from a url stays fresh, from the TTL of its host
+        or of the closest parent domain.
+
+        Parameters
+        ----------
+        url: str, the url.
+
+        Returns
+        -------
+        A float with the number of seconds.
+
+        """
+        host = urllib.parse.urlsplit(url).hostname or ""
+        while host:
+            if host in self.ttls:
+                return self.ttls[host]
+            host = host.partition(".")[2]
+
+        return self.default_ttl
+
+    def object_path(self, digest: str) -> str:
+        """
+        Returns the path of the body with a digest.
+
+        Parameters
+        ----------
+        digest: str, the sha256 of the body.
+
+        Returns
+        -------
+        A string with the path.
+
+        """
+        return os.path.join(self.path, "objects", digest[:2], digest)
+
+    def response(
+        self, url: str, body: bytes, content_type: str
+    ) -> requests.Response:
+        """
+        Makes a response from a cached body, for callers that expect a response.
+
+        Parameters
+        ----------
+        url: str, the url.
+        body: bytes, the body.
+        content_type: str, the Content-Type header of the body.
+
+        Returns
+        -------
+        A requests.Response with a 200 status code.
+
+        """
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response._content = body
+        if content_type:
+            response.headers["Content-Type"] = content_type
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+
+        return response
+
+    def get(
+        self, session: requests.Session, url: str, timeout=None
+    ) -> requests.Response:
+        """
+        Gets a url through the cache, only making a request if there is no fresh
+        entry for it.
+
+        Parameters
+        ----------
+        session: requests.Session, the session to make any request with.
+        url: str, the url.
+        timeout: the timeout of any request.
+
+        Returns
+        -------
+        A response, raising a requests.exceptions.RequestException if the retrieval
+        is not successful.
+
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT digest, etag, last_modified, content_type, stored "
+                "FROM entries WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+        body = None
+        if row is not None:
+            digest, etag, last_modified, content_type, stored = row
+            try:
+                with open(self.object_path(digest), "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                row = None
+
+        now = time.time()
+        if row is not None and now - stored < self.ttl(url):
+            self.touch(url=url, stored=None)
+            with self.lock:
+                self.hits += 1
+            return self.response(url, body, content_type)
+
+        # Revalidate a stale entry rather than download it again
+        headers = {}
+        if row is not None and etag:
+            headers["If-None-Match"] = etag
+        if row is not None and last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        response = session.get(url, headers=headers, timeout=timeout)
+        if row is not None and headers and response.status_code == 304:
+            self.touch(url=url, stored=now)
+            with self.lock:
+                self.revalidations += 1
+            return self.response(url, body, content_type)
+
+        response.raise_for_status()
+        with self.lock:
+            self.misses += 1
+
+        # Do not store eg a consent page under the url of the page that was asked
+        # for, or anything else the circuit breaker counts as a failure, so a cache
+        # hit never hides a failing host
+        if not counts_as_failure(response) and urllib.parse.urlsplit(
+            response.url
+        ).hostname == urllib.parse.urlsplit(url).hostname:
+            self.put(url=url, response=response)
+
+        return response
+
+    def touch(self, url: str, stored: float = None):
+        """
+        Marks an entry as used, and as fresh if stored is given.
+
+        Parameters
+        ----------
+        url: str, the url of the entry.
+        stored: float, the time the entry was revalidated.
+
+        Returns
+        -------
+
+        """
+        now = time.time()
+        with self.lock:
+            if stored is None:
+                self.connection.execute(
+                    "UPDATE entries SET accessed = ? WHERE url = ?", (now, url)
+                )
+            else:
+                self.connection.execute(
+                    "UPDATE entries SET accessed = ?, stored = ? WHERE url = ?",
+                    (now, stored, url),
+                )
+            self.connection.commit()
+
+    def put(self, url: str, response: requests.Response):
+        """
+        Stores a response, then evicts the least recently used entries if the cache
+        is over its size cap. Bodies larger than the cap are not stored.
+
+        Parameters
+        ----------
+        url: str, the url of the response.
+        response: requests.Response, the successful response.
+
+        Returns
+        -------
+
+        """
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self.object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            temp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(body)
+            os.replace(temp_path, object_path)
+
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    digest,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    response.headers.get("Content-Type"),
+                    now,
+                    now,
+                    len(body),
+                ),
+            )
+            self.connection.commit()
+
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the bodies they hold fit in
+        the size cap. A body is only deleted once no url refers to it.
+
+        Returns
+        -------
+
+        """
+        with self.lock:
+            total = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM "
+                "(SELECT MAX(size) AS size FROM entries GROUP BY digest)"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            rows = self.connection.execute(
+                "SELECT url, digest, size FROM entries ORDER BY accessed"
+            ).fetchall()
+            references = Counter(digest for _, digest, _ in rows)
+
+            evicted = []
+            for url, digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append(url)
+                references[digest] -= 1
+                if references[digest] == 0:
+                    total -= size
+                    try:
+                        os.remove(self.object_path(digest))
+                    except FileNotFoundError:
+                        pass
+
+            self.connection.executemany(
+                "DELETE FROM entries WHERE url = ?", [(url,) for url in evicted]
+            )
+            self.connection.commit()
+
+    def stats(self) -> dict:
+        """
+        Returns the hit ratio and the number of requests saved and made.
+
+        Returns
+        -------
+        A dict of the statistics. Revalidations count as hits, as no body is
+        downloaded for them.
+
+        """
+        with self.lock:
+            entries = self.connection.execute(
+                "SELECT COUNT(*) FROM entries"
+            ).fetchone()[0]
+            size = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM "
+                "(SELECT MAX(size) AS size FROM entries GROUP BY digest)"
+            ).fetchone()[0]
+            lookups = self.hits + self.revalidations + self.misses
+
+            return {
+                "hits": self.hits,
+                "revalidations": self.revalidations,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.revalidations) / lookups
+                if lookups
+                else 0.0,
+                "entries": entries,
+                "bytes": size,
+            }
+
+
+def use_http_cache(path: str = "http_cache", **kwargs) -> HTTPCache:
+    """
+    Puts an HTTPCache under every outbound request of the module that is not given
+    a cache of its own.
+
+    Parameters
+    ----------
+    path: str, the directory of the cache.
+    kwargs: any other params of the HTTPCache class.
+
+    Returns
+    -------
+    The HTTPCache.
+
+    """
+    global http_cache
+
+    http_cache = HTTPCache(path=path, **kwargs)
+
+    return http_cache
+
+
+class Downloader:
+    """
+    Class downloads pages and images over one keep-alive requests session. Connections
+    are pooled, every request has a timeout and failed requests are retried, and many
+    images can be fetched concurrently through a bounded thread pool. Responses go
+    through an HTTPCache, if one is given or set with the func use_http_cache.
+
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        timeout: tuple = (5, 15),
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        cache: HTTPCache = None,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+
+        # Retry on connection errors and on the usual transient status codes
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry
+        )
+
+        self.session = GuardedSession()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.lock = threading.Lock()
+        self.requests_made = 0
+        self.bytes_downloaded = 0
+
+    def get(self, url: str) -> requests.Response:
+        """
+        Retrieves a response from the URL through the shared session.
+
+        Parameters
+        ----------
+        url: str, the URL param.
+
+        Returns
+        -------
+        A response, raising a requests.exceptions.RequestException if the retrieval
+        is not successful.
+
+        """
+        cache = self.cache if self.cache is not None else http_cache
+        if cache is not None:
+            response = cache.get(session=self.session, url=url, timeout=self.timeout)
+        else:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+
+        with self.lock:
+            self.requests_made += 1
+            self.bytes_downloaded += len(response.content)
+
+        return response
+
+    def fetch_image(self, image_url: str):
+        """
+        Fetches an image and normalises it into a fully decoded RGB image.
+
+        Parameters
+        ----------
+        image_url: str, the url of the image to be loaded.
+
+        Returns
+        -------
+        A PIL image in RGB mode, with its pixel data already loaded.
+
+        """
+        response = self.get(url=image_url)
+        image = Image.open(BytesIO(response.content)).convert("RGB")
+
+        # Force the decode now rather than on first use
+        image.load()
+
+        return image
+
+    def fetch_images(self, image_urls: list) -> dict:
+        """
+        Fetches many images concurrently using the func fetch_image.
+
+        Parameters
+        ----------
+        image_urls: list, a list of the image urls to be loaded.
+
+        Returns
+        -------
+        A dict of the image urls and their images. Images that could not be loaded
+        are left out and logged.
+
+        """
+        requests_made = self.requests_made
+        bytes_downloaded = self.bytes_downloaded
+        start = time.perf_counter()
+
+        images = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.fetch_image, image_url): image_url
+                for image_url in image_urls
+            }
+            for future in as_completed(futures):
+                image_url = futures[future]
+                try:
+                    images[image_url] = future.result()
+                except Exception as e:
+                    logging.info(f"Could not load {image_url}: {e}")
+
+        # Report the throughput of the crawl
+        elapsed = time.perf_counter() - start
+        fetched = self.requests_made - requests_made
+        fetched_bytes = self.bytes_downloaded - bytes_downloaded
+        logging.info(
+            f"Fetched {fetched} images ({fetched_bytes} bytes) in {elapsed:.2f}s, "
+            f"{fetched / max(elapsed, 1e-9):.1f} images/s"
+        )
+
+        return images
+
+
+class DecodedImage:
+    """
+    Class holds an image that has been fetched and decoded once, and hands out
+    read-only NumPy views of it (RGB, grayscale and thresholded) to every consumer.
+    The derived views are computed the first time they are asked for and then kept.
+
+    """
+
+    def __init__(self, url: str, rgb: np.ndarray):
+        self.url = url
+        self.rgb = rgb
+        self.rgb.setflags(write=False)
+        self.gray_view = None
+        self.threshold_views = {}
+
+    def gray(self) -> np.ndarray:
+        """
+        Returns the image in grayscale.
+
+        Returns
+        -------
+        A read-only (H, W) uint8 array.
+
+        """
+        if self.gray_view is None:
+            self.gray_view = cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+            self.gray_view.setflags(write=False)
+
+        return self.gray_view
+
+    def threshold(self, value: int = 127) -> np.ndarray:
+        """
+        Returns the inverted binary threshold of the grayscale image.
+
+        Parameters
+        ----------
+        value: int, the grayscale value to threshold at.
+
+        Returns
+        -------
+        A read-only (H, W) uint8 array, 255 where the image is darker than the value.
+
+        """
+        if value not in self.threshold_views:
+            _, thresh = cv2.threshold(
+                self.gray(), value, 255, cv2.THRESH_BINARY_INV
+            )
+            thresh.setflags(write=False)
+            self.threshold_views[value] = thresh
+
+        return self.threshold_views[value]
+
+    def pil(self):
+        """
+        Returns the image as a PIL image in RGB mode.
+
+        Returns
+        -------
+        A PIL image.
+
+        """
+        return Image.fromarray(self.rgb)
+
+
+class ImageFetcher:
+    """
+    Class fetches and decodes each image url once and shares the decoded image between
+    every image entry point, keeping the most recently used images in memory. Threads
+    asking for a url that is already being fetched wait for that fetch rather than
+    starting their own.
+
+    """
+
+    def __init__(self, downloader: Downloader = None, max_size: int = 64):
+        self.downloader = downloader if downloader is not None else Downloader()
+        self.max_size = max_size
+        self.images = OrderedDict()
+        # The Futures of the urls being fetched, shared by every thread asking for them
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def fetch(self, url: str) -> DecodedImage:
+        """
+        Returns the decoded image for a url, fetching it if it has not been seen. If
+        another thread is already fetching the url, its result is shared.
+
+        Parameters
+        ----------
+        url: str, the url of the image.
+
+        Returns
+        -------
+        A DecodedImage.
+
+        Raises
+        ------
+        The exception of the fetch, to every thread waiting for it.
+
+        """
+        with self.lock:
+            image = self.images.get(url)
+            if image is not None:
+                self.images.move_to_end(url)
+                return image
+
+            future = self.in_flight.get(url)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.in_flight[url] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            response = self.downloader.get(url=url)
+            rgb = np.asarray(Image.open(BytesIO(response.content)).convert("RGB"))
+            image = DecodedImage(url=url, rgb=rgb)
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[url]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.images[url] = image
+            while len(self.images) > self.max_size:
+                self.images.popitem(last=False)
+            del self.in_flight[url]
+        future.set_result(image)
+
+        return image
+
+    def fetch_many(self, urls: list) -> list:
+        """
+        Fetches several image urls concurrently with the func fetch.
+
+        Parameters
+        ----------
+        urls: list, a list of the urls of the images.
+
+        Returns
+        -------
+        A list of DecodedImages, in the same order as the urls; None for images
+        that could not be loaded.
+
+        """
+        def fetch_or_none(url: str):
+            try:
+                return self.fetch(url=url)
+            except Exception as e:
+                logging.info(f"Could not load {url}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.downloader.max_workers) as executor:
+            return list(executor.map(fetch_or_none, urls))
+
+
+def shared_image_fetcher() -> ImageFetcher:
+    """
+    Returns the ImageFetcher shared by every image entry point in the module, making
+    it the first time it is asked for.
+
+    Returns
+    -------
+    An ImageFetcher.
+
+    """
+    global image_fetcher
+
+    if image_fetcher is None:
+        image_fetcher = ImageFetcher()
+
+    return image_fetcher
+
+
+class PerceptualHashIndex:
+    """
+    Class indexes 64-bit perceptual hashes (dHash) in a BK-tree, so that the images
+    closest to a query image in hamming distance can be found without comparing it
+    against every image in the bank.
+
+    """
+
+    def __init__(self):
+        # Each node is [hash, item ids, {distance: child node}]
+        self.root = None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def dhash(self, image, hash_size: int = 8) -> int:
+        """
+        Computes the difference hash of an image; each bit records whether a pixel is
+        brighter than its right-hand neighbour on a small grayscale thumbnail.
+
+        Parameters
+        ----------
+        image: the PIL image to be hashed.
+        hash_size: int, the height of the thumbnail; the hash has hash_size ** 2 bits.
+
+        Returns
+        -------
+        An int with the hash of the image.
+
+        """
+        thumbnail = np.asarray(
+            image.convert("L").resize((hash_size + 1, hash_size)), dtype=np.int16
+        )
+        bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+
+        return int("".join("1" if bit else "0" for bit in bits), 2)
+
+    def hamming_distance(self, hash_one: int, hash_two: int) -> int:
+        """
+        Counts the number of bits that differ between two hashes.
+
+        Parameters
+        ----------
+        hash_one: int, the first hash.
+        hash_two: int, the second hash.
+
+        Returns
+        -------
+        An int with the hamming distance between the hashes.
+
+        """
+        return bin(hash_one ^ hash_two).count("1")
+
+    def add(self, image_hash: int, item_id: int):
+        """
+        Adds a hash to the tree.
+
+        Parameters
+        ----------
+        image_hash: int, the hash of the image.
+        item_id: int, the id to be returned when the hash is matched.
+
+        Returns
+        -------
+
+        """
+        self.size += 1
+
+        if self.root is None:
+            self.root = [image_hash, [item_id], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = self.hamming_distance(image_hash, node[0])
+
+            # Identical hashes share a node
+            if distance == 0:
+                node[1].append(item_id)
+                return
+
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [image_hash, [item_id], {}]
+                return
+
+            node = child
+
+    def query(self, image_hash: int, k: int = 5, max_distance: int = 64) -> list:
+        """
+        Finds the k nearest hashes in the tree to the image_hash param.
+
+        Parameters
+        ----------
+        image_hash: int, the hash of the query image.
+        k: int, the number of candidates to return.
+        max_distance: int, the largest hamming distance to consider a match.
+
+        Returns
+        -------
+        A list of (item_id, distance) tuples, closest first.
+
+        """
+        if self.root is None:
+            return []
+
+        # Keep the best k as a max-heap of (-distance, item_id)
+        best = []
+        nodes = [self.root]
+
+        while nodes:
+            node = nodes.pop()
+            distance = self.hamming_distance(image_hash, node[0])
+
+            for item_id in node[1]:
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, item_id))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, item_id))
+
+            # Only children within the current search radius can improve on best
+            radius = -best[0][0] if len(best) == k else max_distance
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    nodes.append(child)
+
+        candidates = sorted((-distance, item_id) for distance, item_id in best)
+
+        return [
+            (item_id, distance)
+            for distance, item_id in candidates
+            if distance <= max_distance
+        ]
+
+
+class DescriptorIndex:
+    """
+    Class indexes ORB keypoint descriptors for every image in a SignBank with a FLANN
+    LSH index. Unlike the pixel difference, descriptor matches survive the same sign
+    being scaled, cropped or padded differently.
+
+    """
+
+    def __init__(self, image_array: np.ndarray, image_size: int = 256, n_features: int = 500):
+        self.image_size = image_size
+        self.orb = cv2.ORB_create(nfeatures=n_features)
+
+        # Descriptors are only added for images that have keypoints; item_ids maps
+        # the position of an image in the matcher back to its position in the bank
+        self.item_ids = []
+        self.points = []
+        descriptors = []
+
+        for item_id, image in enumerate(image_array):
+            keypoints, image_descriptors = self.detect(image=image)
+            if image_descriptors is None:
+                continue
+
+            self.item_ids.append(item_id)
+            self.points.append(np.float32([keypoint.pt for keypoint in keypoints]))
+            descriptors.append(image_descriptors)
+
+        # FLANN_INDEX_LSH, suited to binary descriptors such as ORB
+        index_params = dict(algorithm=6, table_number=6, key_size=12, multi_probe_level=1)
+        self.matcher = cv2.FlannBasedMatcher(index_params, dict(checks=50))
+        if descriptors:
+            self.matcher.add(descriptors)
+            self.matcher.train()
+
+    def detect(self, image: np.ndarray):
+        """
+        Finds the ORB keypoints and descriptors of an image.
+
+        Parameters
+        ----------
+        image: np.ndarray, the (H, W, 3) uint8 RGB image.
+
+        Returns
+        -------
+        The keypoints and a uint8 array of their descriptors, or None if there
+        are none.
+
+        """
+        gray = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2GRAY)
+
+        # Bring every image to the same scale, as small images have few keypoints
+        scale = self.image_size / max(gray.shape)
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+
+        return self.orb.detectAndCompute(gray, None)
+
+    def query(self, image: np.ndarray, k: int = 3, ratio: float = 0.75) -> list:
+        """
+        Finds the images in the index that share the most geometrically consistent
+        keypoint matches with the image param.
+
+        Parameters
+        ----------
+        image: np.ndarray, the (H, W, 3) uint8 RGB query image.
+        k: int, the number of candidates to verify and return.
+        ratio: float, the ratio test threshold for a match to be kept.
+
+        Returns
+        -------
+        A list of (item_id, inliers) tuples, most inliers first.
+
+        """
+        if not self.item_ids:
+            return []
+
+        keypoints, descriptors = self.detect(image=image)
+        if descriptors is None:
+            return []
+
+        # Keep the matches that are clearly better than the next best
+        good = {}
+        for match in self.matcher.knnMatch(descriptors, k=2):
+            if len(match) == 2 and match[0].distance >= ratio * match[1].distance:
+                continue
+            if len(match) > 0:
+                good.setdefault(match[0].imgIdx, []).append(match[0])
+
+        # Verify the images with the most matches with a RANSAC homography
+        candidates = sorted(good.items(), key=lambda item: len(item[1]), reverse=True)
+        results = []
+        for image_index, matches in candidates[:k]:
+            inliers = len(matches)
+            if len(matches) >= 4:
+                source = np.float32([keypoints[m.queryIdx].pt for m in matches])
+                target = self.points[image_index][[m.trainIdx for m in matches]]
+                _, mask = cv2.findHomography(source, target, cv2.RANSAC, 5.0)
+                inliers = int(mask.sum()) if mask is not None else 0
+
+            results.append((self.item_ids[image_index], inliers))
+
+        return sorted(results, key=lambda result: result[1], reverse=True)
+
+
+class CaptionIndex:
+    """
+    Class is an inverted index of the captions of a bank, from each lemma to the ids
+    of the captions that contain it. The topics of a question are resolved to the
+    captions they are about by set intersection, rather than by scanning every
+    caption for every topic.
+
+    """
+
+    def __init__(self, captions: list):
+        self.captions = list(captions)
+        self.postings = {}
+        for item_id, terms in enumerate(
+            shared_text_pipeline().index_terms_many(self.captions)
+        ):
+            for term in terms:
+                self.postings.setdefault(term, set()).add(item_id)
+
+    def __len__(self) -> int:
+        return len(self.captions)
+
+    def rank(self, topics: list) -> list:
+        """
+        Ranks the captions that share lemmas with the topics.
+
+        Parameters
+        ----------
+        topics: list, the lemmatised topics, eg from the func prepare_text_for_lda.
+
+        Returns
+        -------
+        A list of (item_id, overlap) tuples, where overlap is the number of distinct
+        topics in the caption, most overlap first.
+
+        """
+        overlaps = Counter()
+        for topic in set(topics):
+            overlaps.update(self.postings.get(topic, ()))
+
+        return sorted(overlaps.items(), key=lambda item: (-item[1], item[0]))
+
+
+class SignBank:
+    """
+    Class holds the Highway Code image bank in memory. Every control image is fetched,
+    decoded, converted to RGB and resized to a canonical size once, then stored as one
+    contiguous (N, H, W, 3) uint8 array so that a test image can be scored against the
+    whole bank in a single vectorised pass.
+
+    """
+
+    def __init__(
+        self,
+        highway_code_image_dict: dict,
+        image_size: tuple = (128, 128),
+        downloader: Downloader = None,
+        source_url: str = None,
+    ):
+        self.image_size = tuple(image_size)
+        self.source_url = source_url
+        self.source_digest = SignBank.digest(highway_code_image_dict)
+        self.image_urls = []
+        self.captions = []
+        self.hashes = []
+
+        # Fetch every control image concurrently
+        if downloader is None:
+            downloader = Downloader()
+        loaded_images = downloader.fetch_images(
+            image_urls=list(highway_code_image_dict.keys())
+        )
+
+        # For each control image from the image bank, in the original order
+        images = []
+        for image_url, caption in highway_code_image_dict.items():
+            image = loaded_images.get(image_url)
+            if image is None:
+                continue
+
+            self.image_urls.append(image_url)
+            self.captions.append(caption)
+            images.append(
+                ImageComparison().to_canonical_array(
+                    image=image, image_size=image_size
+                )
+            )
+            self.hashes.append(PerceptualHashIndex().dhash(image=image))
+
+        # Stack the images into one contiguous array
+        width, height = image_size
+        if images:
+            self.image_array = np.ascontiguousarray(np.stack(images))
+        else:
+            self.image_array = np.zeros((0, height, width, 3), dtype=np.uint8)
+
+        # Index the perceptual hashes for fast candidate lookups
+        self.index_hashes()
+        self.pyramid_levels = {}
+        self.descriptors = None
+        self.captions_index = None
+
+    def __len__(self) -> int:
+        return len(self.captions)
+
+    def index_hashes(self):
+        """
+        Builds the perceptual hash index from the hashes held in the bank.
+
+        Returns
+        -------
+
+        """
+        self.hash_index = PerceptualHashIndex()
+        for item_id, image_hash in enumerate(self.hashes):
+            self.hash_index.add(image_hash=image_hash, item_id=item_id)
+
+    def check_threshold(
+        self,
+        images: list = None,
+        threshold: float = SIGN_MATCH_THRESHOLD,
+        neighbours: int = 3,
+    ) -> list:
+        """
+        Checks that the scores on the canonical size give the same captions at the
+        threshold as the func image_comparison, which scores on the size of the test
+        image. Each control image is scored both ways against its closest controls,
+        the pairs most likely to fall either side of the threshold. It is a
+        validation step, eg after the func build_sign_bank, as it compares every
+        image in the bank with every other.
+
+        Parameters
+        ----------
+        images: list, the PIL control images, in the order of the bank; fetched
+        from their urls if not given.
+        threshold: float, the threshold to check.
+        neighbours: int, the number of closest controls to score each control against.
+
+        Returns
+        -------
+        A list of (image url, image url, score, canonical score) tuples for the pairs
+        that are matched on one size but not on the other.
+
+        """
+        disagreements = []
+        neighbours = min(neighbours, len(self) - 1)
+        if neighbours <= 0:
+            return disagreements
+
+        if images is None:
+            images = [
+                image.pil() if image is not None else None
+                for image in shared_image_fetcher().fetch_many(urls=self.image_urls)
+            ]
+
+        scores = np.stack(
+            [
+                ImageComparison().batch_image_comparison(
+                    test_array=test_array, image_array=self.image_array
+                )
+                for test_array in self.image_array
+            ]
+        )
+        np.fill_diagonal(scores, np.inf)
+        closest = np.argpartition(scores, neighbours - 1, axis=1)[:, :neighbours]
+
+        for i, item_ids in enumerate(closest):
+            for j in item_ids:
+                if images[i] is None or images[j] is None:
+                    continue
+                score = ImageComparison().image_comparison(
+                    image_one=images[i].convert("RGB"),
+                    image_two=images[j].convert("RGB"),
+                )
+                if (score < threshold) != (scores[i, j] < threshold):
+                    disagreements.append(
+                        (
+                            self.image_urls[i],
+                            self.image_urls[j],
+                            round(score, 2),
+                            round(float(scores[i, j]), 2),
+                        )
+                    )
+
+        return disagreements
+
+    @staticmethod
+    def digest(highway_code_image_dict: dict) -> str:
+        """
+        Makes a digest of the image urls and captions of an image bank, so that a
+        saved bank can be checked against the live page.
+
+        Parameters
+        ----------
+        highway_code_image_dict: dict, the image urls and their captions.
+
+        Returns
+        -------
+        A string with the sha256 digest of the image bank.
+
+        """
+        lines = sorted(
+            f"{image_url}\t{caption}"
+            for image_url, caption in highway_code_image_dict.items()
+        )
+
+        return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+    def save(self, path: str):
+        """
+        Saves the bank to a directory as a versioned artifact: a manifest, a table of
+        captions and source urls, the perceptual hashes and the (N, H, W, 3) image
+        array as .npy files. Each file is written to a temporary name first and moved
+        into place, with the manifest last, so a reader never sees a partial artifact.
+
+        Parameters
+        ----------
+        path: str, the directory to save the bank to.
+
+        Returns
+        -------
+
+        """
+        os.makedirs(path, exist_ok=True)
+
+        manifest = {
+            "version": SIGN_BANK_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "source_url": self.source_url,
+            "source_digest": self.source_digest,
+            "image_size": list(self.image_size),
+            "count": len(self),
+        }
+        captions = [
+            {"image_url": image_url, "caption": caption}
+            for image_url, caption in zip(self.image_urls, self.captions)
+        ]
+
+        def replace(filename: str, write):
+            temp_path = os.path.join(path, f".{filename}.tmp")
+            with open(temp_path, "wb") as f:
+                write(f)
+            os.replace(temp_path, os.path.join(path, filename))
+
+        replace("images.npy", lambda f: np.save(f, self.image_array))
+        replace(
+            "hashes.npy",
+            lambda f: np.save(f, np.array(self.hashes, dtype=np.uint64)),
+        )
+        replace(
+            "captions.json",
+            lambda f: f.write(json.dumps(captions, indent=1).encode("utf-8")),
+        )
+        replace(
+            "manifest.json",
+            lambda f: f.write(json.dumps(manifest, indent=1).encode("utf-8")),
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Opens a bank saved with the func save. The image array is memory-mapped rather
+        than read, so opening the bank is cheap and processes on the same host share
+        the page cache rather than each holding its own copy.
+
+        Parameters
+        ----------
+        path: str, the directory the bank was saved to.
+
+        Returns
+        -------
+        A SignBank.
+
+        """
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+
+        if manifest.get("version") != SIGN_BANK_VERSION:
+            raise ValueError(
+                f"Sign bank at {path} is version {manifest.get('version')}, "
+                f"expected version {SIGN_BANK_VERSION}"
+            )
+
+        with open(os.path.join(path, "captions.json")) as f:
+            captions = json.load(f)
+
+        sign_bank = cls.__new__(cls)
+        sign_bank.image_size = tuple(manifest["image_size"])
+        sign_bank.source_url = manifest["source_url"]
+        sign_bank.source_digest = manifest["source_digest"]
+        sign_bank.image_urls = [row["image_url"] for row in captions]
+        sign_bank.captions = [row["caption"] for row in captions]
+        sign_bank.hashes = [
+            int(image_hash) for image_hash in np.load(os.path.join(path, "hashes.npy"))
+        ]
+        sign_bank.image_array = np.load(
+            os.path.join(path, "images.npy"), mmap_mode="r"
+        )
+        sign_bank.index_hashes()
+        sign_bank.pyramid_levels = {}
+        sign_bank.descriptors = None
+        sign_bank.captions_index = None
+
+        return sign_bank
+
+    def is_stale(self, url: str = None, downloader: Downloader = None) -> bool:
+        """
+        Checks whether the images on the live Highway Code page have changed since the
+        bank was built.
+
+        Parameters
+        ----------
+        url: str, the url of the page; defaults to the url the bank was built from.
+        downloader: Downloader, the downloader to fetch the page with.
+
+        Returns
+        -------
+        A bool, True if the bank no longer matches the page.
+
+        """
+        highway_code_image_dict = ImageComparison().make_highway_code_image_dict(
+            url=url or self.source_url, downloader=downloader
+        )
+
+        return SignBank.digest(highway_code_image_dict) != self.source_digest
+
+    def to_dict(self) -> dict:
+        """
+        Returns the image urls and captions held in the bank, in the same format as
+        the func make_highway_code_image_dict in the ImageComparison class.
+
+        Returns
+        -------
+        A dict of image urls and their relevant captions.
+
+        """
+        return dict(zip(self.image_urls, self.captions))
+
+    def pyramid_level(self, size: int) -> np.ndarray:
+        """
+        Returns the images in the bank downsampled to size x size, for coarse-to-fine
+        searches. Each level is made the first time it is asked for and then kept.
+
+        Parameters
+        ----------
+        size: int, the width and height of the level.
+
+        Returns
+        -------
+        An (N, size, size, 3) uint8 array of the images.
+
+        """
+        if size not in self.pyramid_levels:
+            level = np.zeros((len(self), size, size, 3), dtype=np.uint8)
+            for i, image_array in enumerate(self.image_array):
+                level[i] = ImageComparison().downsample(
+                    image_array=image_array, size=size
+                )
+            self.pyramid_levels[size] = level
+
+        return self.pyramid_levels[size]
+
+    def descriptor_index(self) -> DescriptorIndex:
+        """
+        Returns the ORB descriptor index of the bank, building it the first time it is
+        asked for.
+
+        Returns
+        -------
+        A DescriptorIndex.
+
+        """
+        if self.descriptors is None:
+            self.descriptors = DescriptorIndex(image_array=self.image_array)
+
+        return self.descriptors
+
+    def caption_index(self) -> CaptionIndex:
+        """
+        Returns the inverted index of the captions of the bank, building it the first
+        time it is asked for.
+
+        Returns
+        -------
+        A CaptionIndex.
+
+        """
+        if self.captions_index is None:
+            self.captions_index = CaptionIndex(captions=self.captions)
+
+        return self.captions_index
+
+    def hash_candidates(self, image, k: int = 5) -> list:
+        """
+        Looks up the captions whose perceptual hashes are closest to the image param.
+
+        Parameters
+        ----------
+        image: the PIL image to be looked up.
+        k: int, the number of candidates to return.
+
+        Returns
+        -------
+        A list of (item_id, caption, distance) tuples, closest first.
+
+        """
+        image_hash = PerceptualHashIndex().dhash(image=image)
+        candidates = self.hash_index.query(image_hash=image_hash, k=k)
+
+        return [
+            (item_id, self.captions[item_id], distance)
+            for item_id, distance in candidates
+        ]
+
+
+def shared_sign_bank(highway_code_image_dict, max_size: int = 4) -> SignBank:
+    """
+    Returns the SignBank of an image bank dict, shared by the module, building it
+    the first time the dict is seen. Lets the entry points that are passed a dict
+    rather than a SignBank build the bank once rather than on every call.
+
+    Parameters
+    ----------
+    highway_code_image_dict: SignBank or dict, the image bank; a SignBank is
+    returned as it is.
+    max_size: int, the number of banks to keep, most recently used last.
+
+    Returns
+    -------
+    A SignBank.
+
+    """
+    if isinstance(highway_code_image_dict, SignBank):
+        return highway_code_image_dict
+
+    key = SignBank.digest(highway_code_image_dict)
+    with sign_banks_lock:
+        sign_bank = sign_banks.get(key)
+        if sign_bank is None:
+            sign_bank = SignBank(highway_code_image_dict=highway_code_image_dict)
+            sign_banks[key] = sign_bank
+        sign_banks.move_to_end(key)
+        while len(sign_banks) > max_size:
+            sign_banks.popitem(last=False)
+
+        return sign_bank
+
+
+class SignMeaningCache:
+    """
+    Class caches the results of the func get_sign_meaning in the ImageComparison class.
+    Results are keyed by a hash of the decoded test image rather than its url, as the
+    same sign is served from different urls. The most recent results are held in a
+    bounded in-memory LRU, and can optionally be persisted to an SQLite database.
+
+    """
+
+    def __init__(self, max_size: int = 1024, path: str = None):
+        self.max_size = max_size
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Optionally persist results between runs
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS sign_meanings "
+                "(key TEXT PRIMARY KEY, caption TEXT, score REAL)"
+            )
+            self.connection.commit()
+
+    def make_key(self, image, sign_bank: SignBank, strategy: str) -> str:
+        """
+        Makes a cache key from the decoded pixels of an image, the bank it is compared
+        against and the strategy used to compare it.
+
+        Parameters
+        ----------
+        image: the PIL test image.
+        sign_bank: SignBank, the image bank to be used.
+        strategy: str, the strategy passed to the func get_sign_meaning.
+
+        Returns
+        -------
+        A string with the key.
+
+        """
+        key = hashlib.sha256()
+        key.update(f"{sign_bank.source_digest}:{strategy}:{image.size}:".encode("utf-8"))
+        key.update(image.tobytes())
+
+        return key.hexdigest()
+
+    def get(self, key: str):
+        """
+        Looks up a result in the cache.
+
+        Parameters
+        ----------
+        key: str, the key made with the func make_key.
+
+        Returns
+        -------
+        A (caption, score) tuple, or None if the result is not cached.
+
+        """
+        with self.lock:
+            result = self.memory.get(key)
+            if result is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return result
+
+            if self.connection is not None:
+                row = self.connection.execute(
+                    "SELECT caption, score FROM sign_meanings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    result = (row[0], row[1])
+                    self.remember(key=key, result=result)
+                    self.hits += 1
+                    return result
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, caption: str, score: float):
+        """
+        Stores a result in the cache.
+
+        Parameters
+        ----------
+        key: str, the key made with the func make_key.
+        caption: str, the closest caption in the bank.
+        score: float, the score of the closest caption.
+
+        Returns
+        -------
+
+        """
+        with self.lock:
+            self.remember(key=key, result=(caption, score))
+
+            if self.connection is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO sign_meanings VALUES (?, ?, ?)",
+                    (key, caption, score),
+                )
+                self.connection.commit()
+
+    def remember(self, key: str, result: tuple):
+        """
+        Adds a result to the in-memory LRU, evicting the least recently used result
+        if it is full. Assumes the lock is held.
+
+        Parameters
+        ----------
+        key: str, the key made with the func make_key.
+        result: tuple, the (caption, score) to be stored.
+
+        Returns
+        -------
+
+        """
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Returns the hit, miss and eviction counters of the cache.
+
+        Returns
+        -------
+        A dict of the counters and the hit ratio.
+
+        """
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.memory),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class ImageComparison:
+    """
+    Class compares an image compared to an image bank and determines its caption.
+    Best suited for questions related to identify Highway Code signs.
+
+    """
+
+    def __init__(self):
+        pass
+
+    def load_sign_bank(self, path: str) -> SignBank:
+        """
+        Opens a bank saved by the func build_sign_bank, memory-mapping its images.
+
+        Parameters
+        ----------
+        path: str, the directory the bank was saved to.
+
+        Returns
+        -------
+        A SignBank.
+
+        """
+        return SignBank.load(path)
+
+    def build_sign_bank(
+        self, url: str, path: str, downloader: Downloader = None
+    ) -> SignBank:
+        """
+        Builds a bank from the Highway Code page and saves it to disk, so that
+        later runs can open it with the func load_sign_bank.
+
+        Parameters
+        ----------
+        url: str, the url to be accessed.
+        path: str, the directory to save the bank to.
+        downloader: Downloader, the downloader to fetch the page and images with.
+
+        Returns
+        -------
+        The SignBank that was saved.
+
+        """
+        if downloader is None:
+            downloader = Downloader()
+
+        highway_code_image_dict = ImageComparison().make_highway_code_image_dict(
+            url=url, downloader=downloader
+        )
+        sign_bank = SignBank(
+            highway_code_image_dict=highway_code_image_dict,
+            downloader=downloader,
+            source_url=url,
+        )
+        sign_bank.save(path)
+
+        return sign_bank
+
+    def make_highway_code_image_bank(
+        self, url: str, downloader: Downloader = None
+    ) -> HTML:
+        """
+        Makes a bank of images from the highway code.
+
+        Parameters
+        ----------
+        url: str, the url to be accessed.
+        downloader: Downloader, the downloader to fetch the page with.
+
+        Returns
+        -------
+        A dataframe with images and their captions
+
+        """
+        # Parse the page and put it into BeautifulSoup
+        if downloader is None:
+            downloader = Downloader()
+        html_page = downloader.get(url=url)
+        soup = BeautifulSoup(html_page.content, "html.parser")
+
+        images = soup.find_all("img")
+
+        df_list = []
+        for image in images:
+            # Retrieve the caption and the image url
+            image_url = image.attrs["src"]
+            img_src = f'<img src="{image_url}"/>'
+            caption = image.attrs["alt"]
+
+            # Put the caption and image into a row
+            row_1 = [img_src, caption]
+
+            # Put the row into the dataframe and transpose it
+            df = pd.DataFrame(row_1).transpose()
+
+            # Give the dataframe some columns
+            df.columns = ["Image", "Caption"]
+
+            # Append the df to the df_list
+            df_list.append(df)
+
+        all_images_df = pd.concat(df_list)
+
+        return HTML(all_images_df.to_html(escape=False))
+
+    def make_highway_code_image_dict(
+        self, url: str, downloader: Downloader = None
+    ) -> dict:
+        """
+        Makes a dictionary of image urls and their relevant captions.
+
+        Parameters
+        ----------
+        url: str, the url to be accessed.
+        downloader: Downloader, the downloader to fetch the page with.
+
+        Returns
+        -------
+
+        """
+        # Parse the page and put it into BeautifulSoup
+        if downloader is None:
+            downloader = Downloader()
+        html_page = downloader.get(url=url)
+        soup = BeautifulSoup(html_page.content, "html.parser")
+
+        images = soup.find_all("img")
+
+        image_urls = []
+        captions = []
+
+        for image in images:
             # Retrieve the caption and the image url
             image_url = image.attrs["src"]
             caption = image.attrs["alt"]
 
-            image_urls.append(image_url)
-            captions.append(caption)
+            image_urls.append(image_url)
+            captions.append(caption)
+
+        return dict(zip(image_urls, captions))
+
+    def image_comparison(self, image_one, image_two) -> float:
+        """
+        Compares two different images and returns a score by comparing their
+        values at the pixel level.
+
+        Parameters
+        ----------
+        image_one: the first image
+        image_two: the second image
+
+        Returns
+        -------
+        A float with the score of how similar the images are. The lower the number,
+        the more similar they are, with 0.0 indicating that they are the same image
+
+        """
+        # Make sure that the images are the same sizes
+        image_two = image_two.resize(image_one.size)
+
+        diff = ImageChops.difference(image_one, image_two)
+
+        stat = ImageStat.Stat(diff)
+
+        diff_ratio = sum(stat.mean) / (len(stat.mean) * 255)
+
+        return diff_ratio * 100
+
+    def to_canonical_array(self, image, image_size: tuple) -> np.ndarray:
+        """
+        Resizes an RGB image to the canonical size used by the SignBank and converts
+        it into a uint8 array.
+
+        Parameters
+        ----------
+        image: the PIL image to be converted.
+        image_size: tuple, the (width, height) to resize the image to.
+
+        Returns
+        -------
+        A (H, W, 3) uint8 array of the image.
+
+        """
+        return np.asarray(image.convert("RGB").resize(image_size), dtype=np.uint8)
+
+    def batch_image_comparison(
+        self, test_array: np.ndarray, image_array: np.ndarray, chunk_size: int = 64
+    ) -> np.ndarray:
+        """
+        Compares a test image against every image in a bank at once and returns a
+        score per image; the mean absolute pixel difference as a percentage of 255,
+        as with the func image_comparison. Unlike that func, both images are at the
+        canonical size of the bank rather than at the size of the test image, see
+        SIGN_MATCH_THRESHOLD.
+
+        Parameters
+        ----------
+        test_array: np.ndarray, the (H, W, 3) uint8 test image.
+        image_array: np.ndarray, the (N, H, W, 3) uint8 bank of control images.
+        chunk_size: int, the number of control images to difference at a time; keeps
+        the size of the intermediate arrays bounded.
+
+        Returns
+        -------
+        A float array of N scores. The lower the number, the more similar the images.
+
+        """
+        test_array = test_array.astype(np.int16)
+        scores = np.empty(len(image_array), dtype=np.float64)
+
+        for start in range(0, len(image_array), chunk_size):
+            chunk = image_array[start : start + chunk_size].astype(np.int16)
+            diff = np.abs(chunk - test_array)
+            scores[start : start + chunk_size] = diff.mean(axis=(1, 2, 3))
+
+        return scores / 255 * 100
+
+    def batch_score_matrix(
+        self, test_arrays: np.ndarray, image_array: np.ndarray, chunk_size: int = 64
+    ) -> np.ndarray:
+        """
+        Compares several test images against every image in a bank at once, using the
+        same score as the func batch_image_comparison.
+
+        Parameters
+        ----------
+        test_arrays: np.ndarray, the (M, H, W, 3) uint8 test images.
+        image_array: np.ndarray, the (N, H, W, 3) uint8 bank of control images.
+        chunk_size: int, the number of control images to difference at a time.
+
+        Returns
+        -------
+        An (M, N) float array of scores. The lower the number, the more similar the
+        images.
+
+        """
+        test_arrays = test_arrays.astype(np.int16)[:, np.newaxis]
+        scores = np.empty((len(test_arrays), len(image_array)), dtype=np.float64)
+
+        for start in range(0, len(image_array), chunk_size):
+            chunk = image_array[start : start + chunk_size].astype(np.int16)
+            diff = np.abs(chunk[np.newaxis] - test_arrays)
+            scores[:, start : start + chunk_size] = diff.mean(axis=(2, 3, 4))
+
+        return scores / 255 * 100
+
+    def sign_meaning_matrix(
+        self, sign_bank: SignBank, tests: list, item_ids: list = None
+    ) -> np.ndarray:
+        """
+        Scores each of several test images against the whole bank, or only some of it.
+
+        Parameters
+        ----------
+        sign_bank: SignBank, the image bank to be used.
+        tests: list, a list of PIL test images in RGB; None for images that could not
+        be loaded.
+        item_ids: list, the ids of the bank images to compare against, if not all.
+
+        Returns
+        -------
+        An (M, N) float array of scores, with a column per bank image compared. Rows
+        of test images that could not be loaded are set to infinity.
+
+        """
+        width, height = sign_bank.image_size
+        test_arrays = np.zeros((len(tests), height, width, 3), dtype=np.uint8)
+        for i, test in enumerate(tests):
+            if test is not None:
+                test_arrays[i] = ImageComparison().to_canonical_array(
+                    image=test, image_size=sign_bank.image_size
+                )
+
+        image_array = sign_bank.image_array
+        if item_ids is not None:
+            image_array = image_array[np.asarray(item_ids, dtype=np.int64)]
+
+        scores = ImageComparison().batch_score_matrix(
+            test_arrays=test_arrays, image_array=image_array
+        )
+        for i, test in enumerate(tests):
+            if test is None:
+                scores[i] = np.inf
+
+        return scores
+
+    def load_test_images(self, highway_code_image_dict, test_img_urls: list):
+        """
+        Makes sure the bank is loaded and loads several test images concurrently.
+
+        Parameters
+        ----------
+        highway_code_image_dict: SignBank or dict, the image bank to be used.
+        test_img_urls: list, a list of the urls of the images to be tested.
+
+        Returns
+        -------
+        The SignBank and a list of PIL test images; None for images that could not
+        be loaded.
+
+        """
+        # Make sure the control images are loaded
+        sign_bank = shared_sign_bank(highway_code_image_dict)
+
+        # Load the test images concurrently
+        test_images = shared_image_fetcher().fetch_many(urls=test_img_urls)
+
+        return sign_bank, [
+            test_image.pil() if test_image is not None else None
+            for test_image in test_images
+        ]
+
+    def get_sign_candidates(
+        self, highway_code_image_dict, test_img_urls: list, top_k: int = 3
+    ) -> list:
+        """
+        Gets the top_k closest captions in the bank for each of several test images.
+
+        Parameters
+        ----------
+        highway_code_image_dict: SignBank or dict, the image bank to be used.
+        test_img_urls: list, a list of the urls of the images to be tested.
+        top_k: int, the number of captions to return per image.
+
+        Returns
+        -------
+        A list with, for each test image, a list of (caption, score) tuples, closest
+        first.
+
+        """
+        sign_bank, tests = ImageComparison().load_test_images(
+            highway_code_image_dict=highway_code_image_dict,
+            test_img_urls=test_img_urls,
+        )
+        scores = ImageComparison().sign_meaning_matrix(sign_bank=sign_bank, tests=tests)
+
+        top_k = min(top_k, scores.shape[1])
+        if top_k == 0:
+            return [[] for _ in test_img_urls]
+
+        # Partially sort each row to find its top_k, then order them
+        top = np.argpartition(scores, top_k - 1, axis=1)[:, :top_k]
+
+        candidates = []
+        for row, item_ids in zip(scores, top):
+            item_ids = item_ids[np.argsort(row[item_ids])]
+            candidates.append(
+                [(sign_bank.captions[item_id], float(row[item_id])) for item_id in item_ids]
+            )
+
+        return candidates
+
+    def get_sign_meanings(
+        self,
+        highway_code_image_dict,
+        test_img_urls: list,
+        threshold: int,
+        one_to_one: bool = False,
+        cache: SignMeaningCache = None,
+        item_ids: list = None,
+    ) -> list:
+        """
+        Gets the captions of several signs at once. All of the test images are scored
+        against the bank in one pass, rather than one pass per image as with the
+        func get_sign_meaning.
+
+        Parameters
+        ----------
+        highway_code_image_dict: SignBank or dict, the image bank to be used.
+        test_img_urls: list, a list of the urls of the images to be tested.
+        threshold: int, the threshold to consider for the scores computed.
+        one_to_one: bool, if True, the captions are assigned so that no two test images
+        are given the same caption and the total score is as low as possible.
+        cache: SignMeaningCache, a cache of previous results to check first.
+        item_ids: list, the ids of the only bank images to compare against, eg the
+        candidates from the func caption_index of the SignBank class. The cache is
+        not used, as it holds results against the whole bank.
+
+        Returns
+        -------
+        A list of (caption, score) tuples, one per test image. The caption is
+        'No caption found' if the score is not below the threshold.
+
+        """
+        sign_bank, tests = ImageComparison().load_test_images(
+            highway_code_image_dict=highway_code_image_dict,
+            test_img_urls=test_img_urls,
+        )
+        captions = sign_bank.captions
+        if item_ids is not None:
+            captions = [sign_bank.captions[item_id] for item_id in item_ids]
+            cache = None
+
+        # Check the cache for images that have been seen before
+        keys = [None] * len(tests)
+        best = [None] * len(tests)
+        if cache is not None:
+            for i, test in enumerate(tests):
+                if test is not None:
+                    keys[i] = cache.make_key(
+                        image=test, sign_bank=sign_bank, strategy="pixel"
+                    )
+                    best[i] = cache.get(key=keys[i])
+
+        # Every image is a hit, and for a one-to-one assignment, no two images share
+        # their closest caption; the cached results are then already the answer
+        cached = [result for result in best if result is not None]
+        all_cached = len(cached) == len(tests) and (
+            not one_to_one or len(set(caption for caption, _ in cached)) == len(cached)
+        )
+
+        if not all_cached:
+            misses = [i for i, result in enumerate(best) if result is None]
+            if one_to_one:
+                misses = list(range(len(tests)))
+
+            scores = ImageComparison().sign_meaning_matrix(
+                sign_bank=sign_bank, tests=[tests[i] for i in misses], item_ids=item_ids
+            )
+            if scores.shape[1] == 0:
+                return [("No caption found", float("inf")) for _ in test_img_urls]
+
+            # Choose a caption for each test image
+            if one_to_one and scores.shape[0] <= scores.shape[1]:
+                rows, item_ids = linear_sum_assignment(
+                    np.where(np.isfinite(scores), scores, np.finfo(np.float64).max / 2)
+                )
+                item_ids = item_ids[np.argsort(rows)]
+            else:
+                item_ids = np.argmin(scores, axis=1)
+
+            for i, row, item_id in zip(misses, scores, item_ids):
+                best[i] = (captions[item_id], float(row[item_id]))
+
+                # Only an image's own closest caption is cached
+                if cache is not None and keys[i] is not None:
+                    closest = int(np.argmin(row))
+                    cache.put(
+                        key=keys[i],
+                        caption=captions[closest],
+                        score=float(row[closest]),
+                    )
+
+        results = []
+        for caption, score in best:
+            if score < threshold:
+                results.append((caption, score))
+            else:
+                results.append(("No caption found", score))
+
+        return results
+
+    def downsample(self, image_array: np.ndarray, size: int) -> np.ndarray:
+        """
+        Downsamples an image by averaging the pixels that fall into each output pixel.
+
+        Parameters
+        ----------
+        image_array: np.ndarray, the (H, W, 3) uint8 image.
+        size: int, the width and height to downsample to.
+
+        Returns
+        -------
+        A (size, size, 3) uint8 array of the image.
+
+        """
+        return np.asarray(
+            Image.fromarray(np.asarray(image_array)).resize((size, size), Image.BOX),
+            dtype=np.uint8,
+        )
+
+    def pyramid_search(
+        self,
+        sign_bank: SignBank,
+        test_array: np.ndarray,
+        levels: tuple = (16, 64),
+        pruning_ratio: float = 0.25,
+        min_candidates: int = 5,
+    ) -> tuple:
+        """
+        Searches the bank from coarse to fine. The test image is scored against every
+        control image at the smallest level, only the best pruning_ratio of them are
+        scored at the next level, and so on up to the full canonical size of the bank,
+        where the final scores are computed.
+
+        Parameters
+        ----------
+        sign_bank: SignBank, the image bank to be used.
+        test_array: np.ndarray, the (H, W, 3) uint8 test image at the canonical size.
+        levels: tuple, the sizes of the coarse levels, smallest first.
+        pruning_ratio: float, the fraction of candidates kept after each coarse level.
+        min_candidates: int, the fewest candidates to keep after each coarse level.
+
+        Returns
+        -------
+        A tuple of the item ids scored at full size, their scores, and a list of
+        (level, number of candidates scored) tuples.
+
+        """
+        item_ids = np.arange(len(sign_bank))
+        survivors = []
+
+        for size in levels:
+            scores = ImageComparison().batch_image_comparison(
+                test_array=ImageComparison().downsample(
+                    image_array=test_array, size=size
+                ),
+                image_array=sign_bank.pyramid_level(size)[item_ids],
+            )
+            survivors.append((size, len(item_ids)))
+
+            # Keep only the best candidates for the next level
+            keep = max(min_candidates, int(np.ceil(len(item_ids) * pruning_ratio)))
+            if keep < len(item_ids):
+                item_ids = item_ids[np.argpartition(scores, keep - 1)[:keep]]
+
+        # The final decision is made at the full size of the bank
+        scores = ImageComparison().batch_image_comparison(
+            test_array=test_array, image_array=sign_bank.image_array[item_ids]
+        )
+        survivors.append((sign_bank.image_size[0], len(item_ids)))
+
+        return item_ids, scores, survivors
+
+    def find_sign_meaning(
+        self,
+        sign_bank: SignBank,
+        test,
+        strategy: str = "pixel",
+        top_k: int = 10,
+        pruning_ratio: float = 0.25,
+    ) -> tuple:
+        """
+        Finds the closest caption in the bank to a test image.
+
+        Parameters
+        ----------
+        sign_bank: SignBank, the image bank to be used.
+        test: the PIL test image, in RGB.
+        strategy: str, either 'pixel' to score the test image against the whole bank,
+        'hash' to only score the top_k candidates from the perceptual hash index,
+        'pyramid' to prune the bank with coarse-to-fine comparisons, or 'orb' to match
+        ORB keypoint descriptors, which tolerates scaled, cropped or padded signs.
+        top_k: int, the number of candidates to re-rank when using the 'hash' strategy.
+        pruning_ratio: float, the fraction of candidates kept after each coarse level
+        when using the 'pyramid' strategy.
+
+        Returns
+        -------
+        A tuple of the closest caption and its score. The caption is None if there
+        are no candidates to compare against.
+
+        """
+        test_array = ImageComparison().to_canonical_array(
+            image=test, image_size=sign_bank.image_size
+        )
+
+        if len(sign_bank) == 0:
+            return None, float("inf")
+
+        # Choose which control images to score, and score them
+        if strategy == "pyramid":
+            item_ids, scores, survivors = ImageComparison().pyramid_search(
+                sign_bank=sign_bank, test_array=test_array, pruning_ratio=pruning_ratio
+            )
+            logging.info(f"Pyramid candidates scored per level: {survivors}")
+        elif strategy == "orb":
+            # Descriptors are matched on the test image as served, not resized
+            matches = sign_bank.descriptor_index().query(image=np.asarray(test))
+            if not matches:
+                return None, float("inf")
+
+            # Report inliers as a score where lower is better, so that the default
+            # threshold of 10 asks for at least 10 inliers
+            item_id, inliers = matches[0]
+            return sign_bank.captions[item_id], 100 / (1 + inliers)
+        else:
+            if strategy == "hash":
+                candidates = sign_bank.hash_candidates(image=test, k=top_k)
+                item_ids = np.array(
+                    [item_id for item_id, _, _ in candidates], dtype=int
+                )
+            elif strategy == "pixel":
+                item_ids = np.arange(len(sign_bank))
+            else:
+                raise ValueError(f"Unknown strategy: {strategy}")
+
+            if len(item_ids) == 0:
+                return None, float("inf")
+
+            # Score the test image against the control images in one pass
+            scores = ImageComparison().batch_image_comparison(
+                test_array=test_array, image_array=sign_bank.image_array[item_ids]
+            )
+
+        # Compute the minimum score
+        min_position = int(np.argmin(scores))
+
+        return sign_bank.captions[int(item_ids[min_position])], float(
+            scores[min_position]
+        )
+
+    def get_sign_meaning(
+        self,
+        highway_code_image_dict,
+        test_img_url: str,
+        threshold: int,
+        strategy: str = "pixel",
+        top_k: int = 10,
+        cache: SignMeaningCache = None,
+        pruning_ratio: float = 0.25,
+    ) -> str:
+        """
+        Gets the caption of a sign based on the available image bank; highlighted in the
+        highway_code_image_dict param.
+
+        Parameters
+        ----------
+        highway_code_image_dict: SignBank or dict, the image bank to be used. Passing a
+        SignBank avoids fetching every control image again for each test image.
+        test_img_url: str, the url of the image to be tested.
+        threshold: int, the threshold to consider for the min_score computed.
+        strategy: str, either 'pixel' to score the test image against the whole bank,
+        'hash' to only score the top_k candidates from the perceptual hash index,
+        'pyramid' to prune the bank with coarse-to-fine comparisons, or 'orb' to match
+        ORB keypoint descriptors, which tolerates scaled, cropped or padded signs.
+        top_k: int, the number of candidates to re-rank when using the 'hash' strategy.
+        cache: SignMeaningCache, a cache of previous results to check first.
+        pruning_ratio: float, the fraction of candidates kept after each coarse level
+        when using the 'pyramid' strategy.
+
+        Returns
+        -------
+        A caption of the test image.
+
+        """
+        # Make sure the control images are loaded
+        sign_bank = shared_sign_bank(highway_code_image_dict)
+
+        # Load the test image
+        test = shared_image_fetcher().fetch(url=test_img_url).pil()
+
+        # Check whether the test image has been seen before
+        result = None
+        if cache is not None:
+            key = cache.make_key(image=test, sign_bank=sign_bank, strategy=strategy)
+            result = cache.get(key=key)
+
+        if result is None:
+            result = ImageComparison().find_sign_meaning(
+                sign_bank=sign_bank,
+                test=test,
+                strategy=strategy,
+                top_k=top_k,
+                pruning_ratio=pruning_ratio,
+            )
+            if cache is not None and result[0] is not None:
+                cache.put(key=key, caption=result[0], score=result[1])
+
+        caption, min_score = result
+
+        # If the min score is less than the threshold, return the caption
+        if caption is not None and min_score < threshold:
+            return caption
+
+        # Else, the image caption cannot be found
+        else:
+            no_caption_outcome = "No caption found"
+            return no_caption_outcome
+
+    def detect_shape(self, image_url: str) -> str:
+        """
+        Detects the shape of an image. Note that this is a simple method
+        and can only detect shapes of images that are regular: circle, rectangle, pentagon,
+        square etc.
+
+        Parameters
+        ----------
+        image_url: str, the url of the image to be tested.
+
+        Returns
+        -------
+        A string with the shape of the image.
+
+        """
+        # Fetch and decode the image once, and threshold its grayscale view
+        thresh = shared_image_fetcher().fetch(url=image_url).threshold(value=127)
+
+        # Find the contours
+        contours, h = cv2.findContours(thresh, 1, 2)
+
+        # For each contour
+        shape = []
+        for contour in contours:
+            # Approximate the shape
+            approx = cv2.approxPolyDP(
+                contour, 0.01 * cv2.arcLength(contour, True), True
+            )
+            if len(approx) == 5:
+                shape.append("pentagon")
+            elif len(approx) == 3:
+                shape.append("triangle")
+            elif len(approx) == 4:
+                shape.append("square")
+            elif len(approx) == 9:
+                shape.append("half-circle")
+            elif len(approx) > 15:
+                shape.append("circle")
+
+        return shape[0]
+
+
+class ImageAnswers:
+    """
+    Class attempts to obtain the answers for image questions.
+
+    """
+    def __init__(self):
+        pass
+
+    def image_answer(
+        self,
+        image_urls: list,
+        highway_code_image_dict,
+        question: str,
+        cache: SignMeaningCache = None,
+    ):
+        """
+        Obtains the answer from the image answers. Uses the ImageComparison
+        class to obtain a caption for the images in the image_urls param.
+
+        Parameters
+        ----------
+        image_urls: list, a list of the image_urls on the page.
+        highway_code_image_dict: SignBank or dict, the image bank to be used.
+        question: str, the question being asked.
+        cache: SignMeaningCache, a cache of previous results to check first.
+
+        Returns
+        -------
+        A string with the answer to the question
+
+        """
+        highway_code_image_dict = shared_sign_bank(highway_code_image_dict)
+
+        # Obtain a caption for all of the image urls in one pass, making sure that
+        # no two images are given the same caption
+        threshold = SIGN_MATCH_THRESHOLD
+        results = ImageComparison().get_sign_meanings(
+            highway_code_image_dict=highway_code_image_dict,
+            test_img_urls=image_urls,
+            threshold=threshold,
+            one_to_one=True,
+            cache=cache,
+        )
+        captions = [caption for caption, _ in results]
+
+        # Make topics from the question, and find the captions that they are about
+        question_topics = CorrectAnswer().prepare_text_for_lda(text=question)
+        ranked = highway_code_image_dict.caption_index().rank(topics=question_topics)
+        overlaps = {
+            highway_code_image_dict.captions[item_id]: overlap
+            for item_id, overlap in ranked
+        }
+
+        # Obtain the answer; the caption of an image that shares the most topics
+        answer = ""
+        matched = [caption for caption in captions if caption in overlaps]
+        if matched:
+            answer = max(matched, key=overlaps.get)
+        elif ranked:
+            # If none of the images were given a caption the question is about, compare
+            # them with only those captions, and take the closest image
+            candidates = ImageComparison().get_sign_meanings(
+                highway_code_image_dict=highway_code_image_dict,
+                test_img_urls=image_urls,
+                threshold=threshold,
+                item_ids=[item_id for item_id, _ in ranked],
+            )
+            closest = min(range(len(candidates)), key=lambda i: candidates[i][1])
+            if candidates[closest][0] != "No caption found":
+                answer = candidates[closest][0]
+                captions[closest] = answer
+
+        # Make a dictionary of captions and their corresponding urls
+        captions_dict = dict(zip(captions, image_urls))
+
+        if answer:
+            answer_outcome = "Answer obtained"
+        else:
+            # In the event that an answer cannot be obtained
+            answer_outcome = "No answer obtained"
+
+        return answer, captions_dict, answer_outcome
+
+    def update_choices_dict(self, captions: list) -> dict:
+        """
+        Updates the choices_dict to contain the captions obtained from the func
+        image_answer.
+
+        Parameters
+        ----------
+        captions: list, a list of captions for the images obtained.
+
+        Returns
+        -------
+        A dict with the captions and the their corresponding question keys.
+
+        """
+        # Make a keys list
+        keys = ["questions-0", "questions-1", "questions-2", "questions-3"]
+
+        return dict(zip(captions, keys))
+
+
+class TextPipeline:
+    """
+    Class preprocesses text into topics the same way as the func prepare_text_for_lda
+    in the CorrectAnswer class, but loads its resources once, memoises lemmas in a
+    bounded cache and can process many texts in one spaCy pass.
+
+    """
+
+    def __init__(self, lemma_cache_size: int = 8192, text_cache_size: int = 256):
+        # Load the language resources once
+        self.ensure_corpus(name="stopwords")
+        self.ensure_corpus(name="wordnet")
+        self.stopwords = frozenset(nltk.corpus.stopwords.words("english"))
+        self.nlp = English()
+        # NLTK loads wordnet the first time it is used, which is not thread safe, so
+        # load it here rather than from whichever threads lemmatise first
+        wn.morphy("loading")
+
+        self.lemma = functools.lru_cache(maxsize=lemma_cache_size)(
+            self.uncached_lemma
+        )
+
+        # The topics of recently processed texts
+        self.text_cache_size = text_cache_size
+        self.texts = OrderedDict()
+        self.lock = threading.Lock()
+
+    def ensure_corpus(self, name: str):
+        """
+        Downloads an NLTK corpus, only if it is not already installed.
+
+        Parameters
+        ----------
+        name: str, the name of the corpus.
+
+        Returns
+        -------
+
+        """
+        try:
+            nltk.data.find(f"corpora/{name}")
+        except LookupError:
+            nltk.download(name)
+
+    def uncached_lemma(self, word: str) -> str:
+        """
+        Finds the lemma of a word using NLTK's wordnet, returning the word itself if
+        there is none.
+
+        Parameters
+        ----------
+        word: str, the initial string input.
+
+        Returns
+        -------
+        A string with the lemma of the word.
+
+        """
+        lemma = wn.morphy(word)
+        if lemma is None:
+            return word
+        else:
+            return lemma
+
+    def doc_tokens(self, doc) -> list:
+        """
+        Turns a spaCy doc into lower-cased tokens, as the func tokenize in the
+        CorrectAnswer class does.
+
+        Parameters
+        ----------
+        doc: the spaCy doc.
+
+        Returns
+        -------
+        A list of the tokens.
+
+        """
+        lda_tokens = []
+        for token in doc:
+            if token.orth_.isspace():
+                continue
+            elif token.like_url:
+                lda_tokens.append("URL")
+            elif token.orth_.startswith("@"):
+                lda_tokens.append("SCREEN_NAME")
+            else:
+                lda_tokens.append(token.lower_)
+        return lda_tokens
+
+    def doc_topics(self, doc) -> tuple:
+        """
+        Turns a spaCy doc into its topics; long, lemmatised tokens that are not
+        stopwords.
+
+        Parameters
+        ----------
+        doc: the spaCy doc.
+
+        Returns
+        -------
+        A tuple of the topics.
+
+        """
+        return tuple(
+            self.lemma(token)
+            for token in self.doc_tokens(doc)
+            if len(token) > 4 and token not in self.stopwords
+        )
+
+    def tokenize(self, text: str) -> list:
+        """
+        Splits up the text into lower-cased tokens.
+
+        Parameters
+        ----------
+        text: str, the initial body of text supplied.
+
+        Returns
+        -------
+        A list of the tokens.
+
+        """
+        return self.doc_tokens(self.nlp(text))
+
+    def prepare(self, text: str) -> list:
+        """
+        Takes the input text and returns the topics in a list.
+
+        Parameters
+        ----------
+        text: str, the initial text input.
+
+        Returns
+        -------
+        A list of words that are the topics of the initial text input.
+
+        """
+        return self.prepare_many([text])[0]
+
+    def prepare_many(self, texts: list) -> list:
+        """
+        Returns the topics of several texts. Texts that have not been seen recently are
+        run through spaCy together in one pass.
+
+        Parameters
+        ----------
+        texts: list, a list of the texts.
+
+        Returns
+        -------
+        A list with a list of topics per text.
+
+        """
+        with self.lock:
+            topics = {text: self.texts.get(text) for text in texts}
+
+        # Process the unseen texts in one pass
+        unseen = [text for text, text_topics in topics.items() if text_topics is None]
+        if unseen:
+            for text, doc in zip(unseen, self.nlp.pipe(unseen)):
+                topics[text] = self.doc_topics(doc)
+
+        with self.lock:
+            for text in topics:
+                self.texts[text] = topics[text]
+                self.texts.move_to_end(text)
+            while len(self.texts) > self.text_cache_size:
+                self.texts.popitem(last=False)
+
+        return [list(topics[text]) for text in texts]
+
+    def index_terms_many(self, texts: list, min_length: int = 3) -> list:
+        """
+        Turns several texts into the terms used by the HighwayCodeIndex; lemmatised
+        alphanumeric tokens that are not stopwords. Shorter words are kept than with
+        the func prepare_many, as words such as 'stop' or 'lane' matter for retrieval.
+
+        Parameters
+        ----------
+        texts: list, a list of the texts.
+        min_length: int, the shortest token to keep.
+
+        Returns
+        -------
+        A list with a list of terms per text.
+
+        """
+        terms = []
+        for doc in self.nlp.pipe(texts):
+            terms.append(
+                [
+                    self.lemma(token)
+                    for token in self.doc_tokens(doc)
+                    if len(token) >= min_length
+                    and token.isalnum()
+                    and token not in self.stopwords
+                ]
+            )
+
+        return terms
+
+
+def shared_text_pipeline() -> TextPipeline:
+    """
+    Returns the TextPipeline shared by the module, making it the first time it is
+    asked for. It is thread safe, as the func warmup can make it in the background
+    while another thread asks for it.
+
+    Returns
+    -------
+    A TextPipeline.
+
+    """
+    global text_pipeline
+
+    with text_pipeline_lock:
+        if text_pipeline is None:
+            text_pipeline = TextPipeline()
+
+        return text_pipeline
+
+
+class HighwayCodeIndex:
+    """
+    Class is a local knowledge base of the Highway Code. The rule text is split into
+    passages and held in an inverted index, and passages are ranked against a
+    question with BM25, so that most questions can be answered without a web search.
+
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages = []
+        self.sources = []
+        self.lengths = []
+        self.postings = {}
+        # When the Highway Code was indexed, as a time.time(), and from which url
+        self.created = None
+        self.source_url = None
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def add_passages(self, passages: list, source: str):
+        """
+        Adds passages to the index. All of the passages are processed in one pass.
+
+        Parameters
+        ----------
+        passages: list, a list of the passage texts.
+        source: str, where the passages came from, eg the url of the page.
+
+        Returns
+        -------
+
+        """
+        for passage, terms in zip(
+            passages, shared_text_pipeline().index_terms_many(passages)
+        ):
+            doc_id = len(self.passages)
+            self.passages.append(passage)
+            self.sources.append(source)
+            self.lengths.append(len(terms))
+
+            for term, frequency in Counter(terms).items():
+                self.postings.setdefault(term, []).append((doc_id, frequency))
+
+    def ingest_page(self, url: str, downloader: Downloader = None) -> int:
+        """
+        Adds the rule text of a Highway Code page to the index, one passage per
+        paragraph or list item.
+
+        Parameters
+        ----------
+        url: str, the url of the page.
+        downloader: Downloader, the downloader to fetch the page with.
+
+        Returns
+        -------
+        An int with the number of passages added.
+
+        """
+        if downloader is None:
+            downloader = Downloader()
+
+        passages = self.page_passages(html=downloader.get(url=url).content)
+        self.add_passages(passages=passages, source=url)
+
+        return len(passages)
+
+    def page_passages(self, html: bytes, min_length: int = 40) -> list:
+        """
+        Splits the main content of a Highway Code page into passages, one per
+        paragraph or list item.
+
+        Parameters
+        ----------
+        html: bytes, the content of the page.
+        min_length: int, the fewest characters for a passage to be kept.
+
+        Returns
+        -------
+        A list of the passage texts.
+
+        """
+        soup = BeautifulSoup(html, "html.parser")
+        content = soup.find("main") or soup
+
+        passages = []
+        for element in content.find_all(["p", "li"]):
+            text = " ".join(element.get_text(" ").split())
+            if len(text) >= min_length:
+                passages.append(text)
+
+        return passages
+
+    def ingest_highway_code(
+        self,
+        url: str = "https://www.gov.uk/guidance/the-highway-code",
+        downloader: Downloader = None,
+    ) -> int:
+        """
+        Adds every section of the Highway Code to the index, following the links from
+        its contents page. The sections are fetched concurrently.
+
+        Parameters
+        ----------
+        url: str, the url of the contents page of the Highway Code.
+        downloader: Downloader, the downloader to fetch the pages with.
+
+        Returns
+        -------
+        An int with the number of passages added.
+
+        """
+        if downloader is None:
+            downloader = Downloader()
+
+        html_page = downloader.get(url=url)
+        soup = BeautifulSoup(html_page.content, "html.parser")
+
+        # The sections are the links that sit under the contents page
+        path = urllib.parse.urlparse(url).path.rstrip("/") + "/"
+        section_urls = []
+        for link in soup.find_all("a", href=True):
+            section_url = urllib.parse.urljoin(url, link["href"]).split("#")[0]
+            if (
+                urllib.parse.urlparse(section_url).path.startswith(path)
+                and section_url not in section_urls
+            ):
+                section_urls.append(section_url)
+
+        with ThreadPoolExecutor(max_workers=downloader.max_workers) as executor:
+            pages = executor.map(
+                lambda section_url: downloader.get(url=section_url).content,
+                section_urls,
+            )
+
+            added = 0
+            for section_url, html in zip(section_urls, pages):
+                passages = self.page_passages(html=html)
+                self.add_passages(passages=passages, source=section_url)
+                added += len(passages)
+
+        logging.info(f"Indexed {added} passages from {len(section_urls)} sections")
+        self.created = time.time()
+        self.source_url = url
+
+        return added
+
+    def search(self, question: str, k: int = 3) -> list:
+        """
+        Ranks the passages in the index against a question with BM25.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        k: int, the number of passages to return.
+
+        Returns
+        -------
+        A list of (score, passage, source) tuples, best first.
+
+        """
+        if not self.passages:
+            return []
+
+        terms = shared_text_pipeline().index_terms_many([question])[0]
+        n = len(self.passages)
+        average_length = sum(self.lengths) / n
+
+        scores = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = np.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings:
+                norm = self.k1 * (
+                    1 - self.b + self.b * self.lengths[doc_id] / average_length
+                )
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (
+                    self.k1 + 1
+                ) / (frequency + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+        return [
+            (float(score), self.passages[doc_id], self.sources[doc_id])
+            for doc_id, score in best
+        ]
+
+    def retrieve(self, question: str, k: int = 3, min_score: float = 8.0):
+        """
+        Retrieves the passages that answer a question from the index.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        k: int, the number of passages to retrieve.
+        min_score: float, the BM25 score the best passage needs for the retrieval to
+        be trusted.
+
+        Returns
+        -------
+        A list of the top passages, best first, or None if the retrieval is not
+        confident enough and a web search should be used instead.
+
+        """
+        results = self.search(question=question, k=k)
+        if not results or results[0][0] < min_score:
+            return None
+
+        return [passage for _, passage, _ in results]
+
+    def answer(self, question: str, k: int = 3, min_score: float = 8.0):
+        """
+        Retrieves an answer to a question from the index, in the same form as the
+        func answer_search in the AnswerSearch class.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        k: int, the number of passages to join into the answer.
+        min_score: float, the BM25 score the best passage needs for the retrieval to
+        be trusted.
+
+        Returns
+        -------
+        A string with the top passages, or None if the retrieval is not confident
+        enough and a web search should be used instead.
+
+        """
+        passages = self.retrieve(question=question, k=k, min_score=min_score)
+        if passages is None:
+            return None
+
+        return " ".join(passages)
+
+    def save(self, path: str):
+        """
+        Saves the passages of the index to a JSON file.
+
+        Parameters
+        ----------
+        path: str, the path of the file.
+
+        Returns
+        -------
+
+        """
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "k1": self.k1,
+                    "b": self.b,
+                    "created": self.created,
+                    "source_url": self.source_url,
+                    "passages": [
+                        {"source": source, "text": passage}
+                        for passage, source in zip(self.passages, self.sources)
+                    ],
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Opens an index saved with the func save, rebuilding the inverted index.
+
+        Parameters
+        ----------
+        path: str, the path of the file.
+
+        Returns
+        -------
+        A HighwayCodeIndex.
+
+        """
+        with open(path) as f:
+            saved = json.load(f)
+
+        index = cls(k1=saved["k1"], b=saved["b"])
+
+        # Add the passages one source at a time, keeping their order
+        passages = saved["passages"]
+        start = 0
+        while start < len(passages):
+            source = passages[start]["source"]
+            end = start
+            while end < len(passages) and passages[end]["source"] == source:
+                end += 1
+            index.add_passages(
+                passages=[row["text"] for row in passages[start:end]], source=source
+            )
+            start = end
+        index.created = saved.get("created")
+        index.source_url = saved.get("source_url")
+
+        return index
+
+    def is_stale(self, max_age: float = KNOWLEDGE_BASE_MAX_AGE) -> bool:
+        """
+        Checks whether the index is too old to be used, without fetching the Highway
+        Code; an index with no record of when it was made counts as stale.
+
+        Parameters
+        ----------
+        max_age: float, the most seconds since the Highway Code was indexed.
+
+        Returns
+        -------
+        A bool, True if the Highway Code should be indexed again.
+
+        """
+        return self.created is None or time.time() - self.created > max_age
+
+
+class NearDuplicateIndex:
+    """
+    Class is an index of previously seen questions that finds near duplicates, eg
+    the same question with different punctuation, contractions or clause order. Each
+    question is turned into a MinHash signature of its word shingles, and the bands
+    of the signatures are hashed into buckets, so that a query only compares against
+    the questions that share a bucket with it. A few words can change the answer to
+    an otherwise similar question, eg "not" or "70", so the func key_terms returns
+    them for callers to compare exactly before using a match.
+
+    """
+
+    CONTRACTIONS = {
+        "n't": "not",
+        "'re": "are",
+        "'ll": "will",
+        "'ve": "have",
+        "'m": "am",
+        "'d": "would",
+        "ca": "can",
+        "wo": "will",
+    }
+    # Words that "'s" is short for "is" after; after any other word it is a
+    # possessive, eg "driver's"
+    IS_CONTRACTIONS = {"it", "that", "what", "there", "here", "who", "where", "how"}
+    # Words that start a clause, so that shingles do not span the clauses of a
+    # question and reordering them does not change its shingles
+    CLAUSE_WORDS = {"when", "if", "before", "after", "while", "until", "unless"}
+    NEGATIONS = {"not", "no", "never", "nor", "none", "nothing", "neither", "cannot"}
+    # Number words, besides any word with a digit, eg "70mph"
+    NUMBERS = {
+        "zero", "one", "two", "three", "four", "five", "six", "seven", "eight",
+        "nine", "ten", "eleven", "twelve", "twenty", "thirty", "forty", "fifty",
+        "sixty", "seventy", "hundred", "thousand", "half", "single", "double",
+        "dual", "first", "second", "third",
+    }
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 2,
+        threshold: float = 0.9,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        # Universal hash functions (a * x + b) mod p, one per permutation
+        rng = np.random.RandomState(seed)
+        self.prime = np.uint64((1 << 61) - 1)
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.buckets = [dict() for _ in range(bands)]
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self.item_ids = []
+        self.questions = []
+        self.payloads = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def clauses(self, question: str) -> list:
+        """
+        Splits a question into the words of its clauses. The words come from the
+        func CorrectAnswer.tokenize, without punctuation and with contractions
+        expanded, and a clause ends at punctuation or before a word such as "when".
+
+        Parameters
+        ----------
+        question: str, the question.
+
+        Returns
+        -------
+        A list with a list of words per clause.
+
+        """
+        clauses = [[]]
+        for token in CorrectAnswer().tokenize(question):
+            token = token.replace("’", "'")
+            previous = clauses[-1][-1] if clauses[-1] else None
+            if token == "'s" and previous in NearDuplicateIndex.IS_CONTRACTIONS:
+                token = "is"
+            token = NearDuplicateIndex.CONTRACTIONS.get(token, token)
+            if not any(character.isalnum() for character in token):
+                clauses.append([])
+                continue
+            if token in NearDuplicateIndex.CLAUSE_WORDS:
+                clauses.append([])
+            clauses[-1].append(token)
+
+        return [clause for clause in clauses if clause]
+
+    def shingles(self, question: str) -> set:
+        """
+        Turns a question into the set of the word n-grams of its clauses, so that
+        "When you're approaching a zebra crossing, what should you do?" has the same
+        shingles as "What should you do when you are approaching a zebra crossing?".
+
+        Parameters
+        ----------
+        question: str, the question.
+
+        Returns
+        -------
+        A set of strings.
+
+        """
+        shingles = set()
+        for words in self.clauses(question):
+            size = min(self.shingle_size, len(words))
+            shingles.update(
+                " ".join(words[i : i + size]) for i in range(len(words) - size + 1)
+            )
+
+        return shingles
+
+    def key_terms(self, question: str) -> tuple:
+        """
+        Returns the words of a question that change its answer however similar the
+        rest of it is; its negations and its numbers.
+
+        Parameters
+        ----------
+        question: str, the question.
+
+        Returns
+        -------
+        A tuple of the sorted negations and the sorted numbers of the question.
+
+        """
+        words = [word for clause in self.clauses(question) for word in clause]
+        negations = sorted(
+            word for word in words if word in NearDuplicateIndex.NEGATIONS
+        )
+        numbers = sorted(
+            word
+            for word in words
+            if word in NearDuplicateIndex.NUMBERS
+            or any(character.isdigit() for character in word)
+        )
+
+        return tuple(negations), tuple(numbers)
+
+    def signature(self, question: str) -> np.ndarray:
+        """
+        Makes the MinHash signature of a question.
+
+        Parameters
+        ----------
+        question: str, the question.
+
+        Returns
+        -------
+        An array of num_perm uint32 values.
+
+        """
+        shingles = self.shingles(question) or {""}
+        hashes = np.array(
+            [
+                int.from_bytes(
+                    hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(),
+                    "little",
+                )
+                for shingle in shingles
+            ],
+            dtype=np.uint64,
+        )
+        permuted = (np.outer(hashes, self.a) + self.b) % self.prime
+        permuted &= np.uint64(0xFFFFFFFF)
+
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> list:
+        """
+        Splits a signature into the bucket keys of its bands.
+
+        Parameters
+        ----------
+        signature: array, the MinHash signature.
+
+        Returns
+        -------
+        A list of bytes, one per band.
+
+        """
+        return [
+            signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def add(self, item_id, question: str, payload=None):
+        """
+        Adds a question to the index. Adding an item_id that is already indexed
+        replaces its payload.
+
+        Parameters
+        ----------
+        item_id: a hashable id of the question, eg its key in the AnswerStore.
+        question: str, the question.
+        payload: anything to return with the question when it is matched.
+
+        Returns
+        -------
+
+        """
+        if item_id in self.positions:
+            self.payloads[self.positions[item_id]] = payload
+            return
+
+        signature = self.signature(question)
+        position = len(self.item_ids)
+        for band, key in enumerate(self.band_keys(signature)):
+            self.buckets[band].setdefault(key, []).append(position)
+
+        # Grow the signature array geometrically, rather than copying on every add
+        if position == len(self.signatures):
+            grown = np.empty((max(16, 2 * position), self.num_perm), dtype=np.uint32)
+            grown[:position] = self.signatures[:position]
+            self.signatures = grown
+        self.signatures[position] = signature
+        self.item_ids.append(item_id)
+        self.questions.append(question)
+        self.payloads.append(payload)
+        self.positions[item_id] = position
+
+    def query(self, question: str, threshold: float = None) -> list:
+        """
+        Finds the indexed questions that are near duplicates of a question.
+
+        Parameters
+        ----------
+        question: str, the question.
+        threshold: float, the least estimated Jaccard similarity of a match, by
+        default the threshold of the index.
+
+        Returns
+        -------
+        A list of (similarity, item_id, question, payload) tuples, most similar
+        first.
+
+        """
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.signature(question)
+
+        candidates = set()
+        for band, key in enumerate(self.band_keys(signature)):
+            candidates.update(self.buckets[band].get(key, ()))
+        if not candidates:
+            return []
+
+        positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = (self.signatures[positions] == signature).mean(axis=1)
+        order = np.argsort(-similarities, kind="stable")
+
+        return [
+            (
+                float(similarities[i]),
+                self.item_ids[positions[i]],
+                self.questions[positions[i]],
+                self.payloads[positions[i]],
+            )
+            for i in order
+            if similarities[i] >= threshold
+        ]
+
+
+class AnswerStore:
+    """
+    Class is a persistent store of the answers given to previous questions, keyed on
+    the normalised question text and the sorted set of choices. A question that has
+    been answered before can be answered again without any search or image work.
+    Questions worded slightly differently are found with a NearDuplicateIndex.
+
+    """
+
+    def __init__(self, path: str = "answers.db"):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, question TEXT, choices TEXT, context TEXT, "
+            "answer TEXT, method TEXT, correct INTEGER, updated TEXT)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS answers_question ON answers (question)"
+        )
+        self.connection.commit()
+        self.question_index = None
+
+    def normalise(self, text: str) -> str:
+        """
+        Normalises text so that trivial differences in case, accents, punctuation
+        and spacing do not change the key.
+
+        Parameters
+        ----------
+        text: str, the initial text input.
+
+        Returns
+        -------
+        A string with the normalised text.
 
-        return dict(zip(image_urls, captions))
+        """
+        text = CorrectAnswer().unicode_to_ascii(text).decode("ascii").lower()
+        text = text.translate(str.maketrans("", "", string.punctuation))
 
-    def image_comparison(self, image_one, image_two) -> float:
+        return " ".join(text.split())
+
+    def make_key(self, question: str, choices: list, context: str = "") -> str:
         """
-        Compares two different images and returns a score by comparing their
-        values at the pixel level.
+        Makes the key of a question from its normalised text and sorted choices.
 
         Parameters
         ----------
-        image_one: the first image
-        image_two: the second image
+        question: str, the question being asked.
+        choices: list, a list of the choices.
+        context: str, anything else that identifies the question, eg a digest of
+        its image.
 
         Returns
         -------
-        A float with the score of how similar the images are. The lower the number,
-        the more similar they are, with 0.0 indicating that they are the same image
+        A string with the key.
 
         """
-        # Make sure that the images are the same sizes
-        image_two = image_two.resize(image_one.size)
+        choices = sorted(self.normalise(choice) for choice in choices)
+        key = "\x1f".join([self.normalise(question), context] + choices)
 
-        diff = ImageChops.difference(image_one, image_two)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
 
-        stat = ImageStat.Stat(diff)
+    def image_context(self, image_url: str) -> str:
+        """
+        Makes a context for a question with an image, from a digest of the decoded
+        image rather than its url, as the same image is served from different urls.
 
-        diff_ratio = sum(stat.mean) / (len(stat.mean) * 255)
+        Parameters
+        ----------
+        image_url: str, the url of the image.
 
-        return diff_ratio * 100
+        Returns
+        -------
+        A string with the digest of the image.
 
-    def get_sign_meaning(
-        self, highway_code_image_dict: dict, test_img_url: str, threshold: int
-    ) -> str:
         """
-        Gets the caption of a sign based on the available image bank; highlighted in the
-        highway_code_image_dict param.
+        image = shared_image_fetcher().fetch(url=image_url)
+
+        return hashlib.sha256(image.rgb.tobytes()).hexdigest()
+
+    def lookup(self, question: str, choices: list, context: str = ""):
+        """
+        Looks up the stored answer to a question.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        choices: list, a list of the choices.
+        context: str, the context passed when the answer was recorded.
+
+        Returns
+        -------
+        A dict with the answer, the method that produced it and whether it was
+        marked correct (None if unknown), or None if the question is not stored.
+
+        """
+        key = self.make_key(question=question, choices=choices, context=context)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT answer, method, correct FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "answer": row[0],
+            "method": row[1],
+            "correct": None if row[2] is None else bool(row[2]),
+        }
+
+    def record(
+        self,
+        question: str,
+        choices: list,
+        answer: str,
+        method: str,
+        context: str = "",
+        correct: bool = None,
+    ):
+        """
+        Records the answer given to a question, replacing any previous answer.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        choices: list, a list of the choices.
+        answer: str, the choice that was given as the answer.
+        method: str, the method that produced the answer, eg 'web_search'.
+        context: str, anything else that identifies the question.
+        correct: bool, whether the answer was marked correct, if known.
+
+        Returns
+        -------
+
+        """
+        self.import_records(
+            records=[
+                {
+                    "question": question,
+                    "choices": list(choices),
+                    "context": context,
+                    "answer": answer,
+                    "method": method,
+                    "correct": correct,
+                }
+            ],
+        )
+
+    def replayable(self, stored: dict) -> bool:
+        """
+        Checks whether a stored answer can be given again. Only answers marked
+        correct are, with the func mark or by importing them with correct set, as an
+        unverified answer, eg from a misleading search result, would otherwise be
+        given again on every later run.
+
+        Parameters
+        ----------
+        stored: dict, a stored answer from the func lookup or lookup_similar.
+
+        Returns
+        -------
+        A bool, True if the answer can be given again.
+
+        """
+        return stored["correct"] is True
+
+    def mark(self, question: str, choices: list, correct: bool, context: str = ""):
+        """
+        Marks whether the stored answer to a question was correct, eg from the
+        results page at the end of a test.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        choices: list, a list of the choices.
+        correct: bool, whether the stored answer was correct.
+        context: str, the context passed when the answer was recorded.
+
+        Returns
+        -------
+
+        """
+        key = self.make_key(question=question, choices=choices, context=context)
+        with self.lock:
+            self.connection.execute(
+                "UPDATE answers SET correct = ?, updated = ? WHERE key = ?",
+                (int(correct), datetime.now().isoformat(timespec="seconds"), key),
+            )
+            self.connection.commit()
+
+        if self.question_index is not None and key in self.question_index.positions:
+            position = self.question_index.positions[key]
+            self.question_index.payloads[position]["correct"] = bool(correct)
+
+    def import_records(self, records) -> int:
+        """
+        Adds many answers to the store in one transaction.
+
+        Parameters
+        ----------
+        records: an iterable of dicts with the keys question, choices, answer and
+        method, and optionally context and correct; the format written by the func
+        export_records.
+
+        Returns
+        -------
+        An int with the number of answers added.
+
+        """
+        updated = datetime.now().isoformat(timespec="seconds")
+        rows = []
+        for record in records:
+            context = record.get("context", "")
+            correct = record.get("correct")
+            rows.append(
+                (
+                    self.make_key(
+                        question=record["question"],
+                        choices=record["choices"],
+                        context=context,
+                    ),
+                    record["question"],
+                    json.dumps(record["choices"]),
+                    context,
+                    record["answer"],
+                    record["method"],
+                    None if correct is None else int(correct),
+                    updated,
+                )
+            )
+
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.commit()
+
+        # Keep the near duplicate index up to date, once it has been built
+        if self.question_index is not None:
+            for row in rows:
+                self.index_row(row=row)
+
+        return len(rows)
+
+    def index_row(self, row: tuple):
+        """
+        Adds a row of the answers table to the near duplicate index.
+
+        Parameters
+        ----------
+        row: tuple, the key, question, choices, context, answer, method and correct
+        columns of the row.
+
+        Returns
+        -------
+
+        """
+        key, question, choices, context, answer, method, correct = row[:7]
+        self.question_index.add(
+            item_id=key,
+            question=question,
+            payload={
+                "choices": json.loads(choices),
+                "context": context,
+                "answer": answer,
+                "method": method,
+                "correct": None if correct is None else bool(correct),
+            },
+        )
+
+    def near_duplicate_index(self) -> "NearDuplicateIndex":
+        """
+        Returns the near duplicate index of the stored questions, building it the
+        first time it is needed.
+
+        Returns
+        -------
+        A NearDuplicateIndex.
+
+        """
+        if self.question_index is None:
+            with self.lock:
+                rows = self.connection.execute(
+                    "SELECT key, question, choices, context, answer, method, correct "
+                    "FROM answers"
+                ).fetchall()
+            self.question_index = NearDuplicateIndex()
+            for row in rows:
+                self.index_row(row=row)
+
+        return self.question_index
+
+    def lookup_similar(
+        self, question: str, choices: list, context: str = "", threshold: float = 0.9
+    ):
+        """
+        Looks up the stored answer to a near duplicate of a question, for when the
+        exact question has not been stored. The stored answer must be one of the
+        choices, the context must be the same, and the negations and numbers of the
+        questions must be the same, as "... should not ..." or "... 30 mph ..." can
+        be very similar to a question with a different answer.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        choices: list, a list of the choices.
+        context: str, the context passed when the answer was recorded.
+        threshold: float, the least estimated Jaccard similarity of the questions.
+
+        Returns
+        -------
+        A dict with the answer, the method that produced it, whether it was marked
+        correct, the matched question and its similarity, or None if there is no
+        near duplicate.
+
+        """
+        answers = {self.normalise(choice): choice for choice in choices}
+        index = self.near_duplicate_index()
+        matches = index.query(question=question, threshold=threshold)
+        key_terms = index.key_terms(question)
+        for similarity, _, matched_question, stored in matches:
+            answer = answers.get(self.normalise(stored["answer"]))
+            if stored["context"] != context or answer is None:
+                continue
+            if index.key_terms(matched_question) != key_terms:
+                continue
+            return {
+                "answer": answer,
+                "method": stored["method"],
+                "correct": stored["correct"],
+                "question": matched_question,
+                "similarity": similarity,
+            }
+
+        return None
+
+    def export_records(self):
+        """
+        Yields every stored answer, in the format read by the func import_records.
+
+        Returns
+        -------
+        A generator of dicts.
+
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT question, choices, context, answer, method, correct "
+                "FROM answers ORDER BY question"
+            ).fetchall()
+
+        for question, choices, context, answer, method, correct in rows:
+            yield {
+                "question": question,
+                "choices": json.loads(choices),
+                "context": context,
+                "answer": answer,
+                "method": method,
+                "correct": None if correct is None else bool(correct),
+            }
+
+    def import_file(self, path: str) -> int:
+        """
+        Adds the answers in a JSON lines file to the store.
+
+        Parameters
+        ----------
+        path: str, the path of the file, with one record per line.
+
+        Returns
+        -------
+        An int with the number of answers added.
+
+        """
+        with open(path) as f:
+            return self.import_records(
+                records=(json.loads(line) for line in f if line.strip())
+            )
+
+    def export_file(self, path: str) -> int:
+        """
+        Writes every stored answer to a JSON lines file.
+
+        Parameters
+        ----------
+        path: str, the path of the file.
+
+        Returns
+        -------
+        An int with the number of answers written.
+
+        """
+        count = 0
+        with open(path, "w") as f:
+            for record in self.export_records():
+                f.write(json.dumps(record) + "\n")
+                count += 1
+
+        return count
+
+
+class PatternMatcher:
+    """
+    Class builds an Aho-Corasick automaton over a set of patterns, so that every
+    occurrence of every pattern in a text can be found in a single scan of the text.
+
+    """
+
+    def __init__(self, patterns: list):
+        self.patterns = list(dict.fromkeys(pattern for pattern in patterns if pattern))
+
+        # The trie; each state has its transitions, its failure link and the ids of
+        # the patterns that end at it
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for character in pattern:
+                next_state = self.goto[state].get(character)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][character] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(pattern_id)
+
+        # Link each state to the longest proper suffix that is also in the trie,
+        # breadth first so that shorter suffixes are linked before longer ones
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fail_state = self.fail[state]
+                while fail_state and character not in self.goto[fail_state]:
+                    fail_state = self.fail[fail_state]
+                self.fail[next_state] = self.goto[fail_state].get(character, 0)
+                self.output[next_state] = (
+                    self.output[next_state] + self.output[self.fail[next_state]]
+                )
+
+    def matches(self, text: str, whole_words: bool = False):
+        """
+        Yields every occurrence of every pattern in the text, in order of where they
+        end.
+
+        Parameters
+        ----------
+        text: str, the text to be scanned.
+        whole_words: bool, if True, only occurrences that are not part of a longer word
+        are yielded.
+
+        Returns
+        -------
+        A generator of (pattern, start, end) tuples.
+
+        """
+        state = 0
+        for position, character in enumerate(text):
+            while state and character not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(character, 0)
+
+            for pattern_id in self.output[state]:
+                pattern = self.patterns[pattern_id]
+                start, end = position + 1 - len(pattern), position + 1
+
+                if whole_words and (
+                    (start > 0 and text[start - 1].isalnum())
+                    or (end < len(text) and text[end].isalnum())
+                ):
+                    continue
+
+                yield pattern, start, end
+
+    def count(self, text: str, whole_words: bool = False) -> dict:
+        """
+        Counts the non-overlapping occurrences of each pattern in the text, as
+        re.findall would for each pattern on its own.
+
+        Parameters
+        ----------
+        text: str, the text to be scanned.
+        whole_words: bool, if True, only occurrences that are not part of a longer word
+        are counted.
+
+        Returns
+        -------
+        A dict of each pattern and its number of occurrences.
+
+        """
+        counts = dict.fromkeys(self.patterns, 0)
+        last_end = {}
+
+        for pattern, start, end in self.matches(text=text, whole_words=whole_words):
+            if start >= last_end.get(pattern, 0):
+                counts[pattern] += 1
+                last_end[pattern] = end
+
+        return counts
+
+    def contains(self, text: str) -> bool:
+        """
+        Checks whether any of the patterns occur in the text, stopping at the first one.
+
+        Parameters
+        ----------
+        text: str, the text to be scanned.
+
+        Returns
+        -------
+        A bool, True if any pattern occurs in the text.
+
+        """
+        for _ in self.matches(text=text):
+            return True
+
+        return False
+
+
+class ScoringEngine:
+    """
+    Class scores multiple choices against an answer scraped from the web. The answer is
+    preprocessed once into unigram and bigram frequency tables, and every choice is
+    then scored against those tables, rather than the answer being processed and
+    searched again for each choice and each gram.
+
+    The gram method compared the bigrams and the complete choice against single
+    processed words, where they could never match, so by default only the unigrams
+    score and the scores are the same as that method's. Pass phrases=True to also score
+    the bigrams and the complete choice as whole-word phrases of the answer.
+
+    """
+
+    def __init__(
+        self, answer: str, question: str, mult: dict = None, phrases: bool = False
+    ):
+        self.mult = mult if mult is not None else {"unigrams": 1, "bigrams": 3, "complete": 10}
+        self.phrases = phrases
+
+        # Process the answer once
+        answer = CorrectAnswer().remove_question_from_answer(
+            text=answer, question=question
+        )
+        self.unigrams = Counter(shared_text_pipeline().prepare(answer))
+
+        words = self.words(text=answer)
+        self.bigrams = Counter(
+            " ".join(bigram) for bigram in CorrectAnswer().get_n_grams(words, 2)
+        )
+        self.text = " ".join(words)
+
+    def words(self, text: str) -> list:
+        """
+        Splits text into lower-cased ascii words, with surrounding punctuation removed.
+
+        Parameters
+        ----------
+        text: str, the initial text input.
+
+        Returns
+        -------
+        A list of words.
+
+        """
+        text = CorrectAnswer().unicode_to_ascii(text).decode("ascii").lower()
+        words = [word.strip(string.punctuation) for word in text.split()]
+
+        return [word for word in words if word]
+
+    def choice_grams(self, choices: list) -> list:
+        """
+        Makes the unigrams, bigrams and complete text of each choice. The unigrams of all
+        of the choices are processed in one pass.
+
+        Parameters
+        ----------
+        choices: list, a list of the choices.
+
+        Returns
+        -------
+        A list with a dict of grams per choice.
+
+        """
+        grams = []
+        for choice, unigrams in zip(
+            choices, shared_text_pipeline().prepare_many(choices)
+        ):
+            words = self.words(text=choice)
+            bigrams = []
+            if len(words) > 2:
+                bigrams = [
+                    " ".join(bigram)
+                    for bigram in CorrectAnswer().get_n_grams(words, 2)
+                ]
+            grams.append(
+                {
+                    "unigrams": unigrams,
+                    "bigrams": bigrams,
+                    "complete": " ".join(words),
+                }
+            )
+
+        return grams
+
+    def score_grams(self, grams: dict) -> int:
+        """
+        Scores the grams of one choice against the frequency tables of the answer.
+
+        Parameters
+        ----------
+        grams: dict, the grams of the choice made with the func choice_grams.
+
+        Returns
+        -------
+        An int with the weighted number of grams that appear in the answer.
+
+        """
+        unigram_score = sum(self.unigrams[gram] for gram in grams["unigrams"])
+        if not self.phrases:
+            return self.mult["unigrams"] * unigram_score
+
+        bigram_score = sum(self.bigrams[gram] for gram in grams["bigrams"])
+        # Only whole-word matches of the complete choice count, so "go" does not
+        # match "going" or "ago"
+        complete_score = (
+            len(re.findall(rf"(?<!\S){re.escape(grams['complete'])}(?!\S)", self.text))
+            if grams["complete"]
+            else 0
+        )
+
+        return (
+            self.mult["unigrams"] * unigram_score
+            + self.mult["bigrams"] * bigram_score
+            + self.mult["complete"] * complete_score
+        )
+
+    def score(self, choices: list) -> tuple:
+        """
+        Scores every choice in a single pass.
 
         Parameters
         ----------
-        highway_code_image_dict: dict, the image bank to be used.
-        test_img_url: str, the url of the image to be tested.
-        threshold: int, the threshold to consider for the min_score computed.
+        choices: list, a list of the choices.
 
         Returns
         -------
-        A caption of the test image.
+        A list of scores, one per choice, and the margin of the best score over the
+        second best as a fraction of the best; 0.0 if the best is tied or zero.
 
         """
-        # Make a list of image urls from the database
-        controls = list(highway_code_image_dict.keys())
-
-        # Load the test image
-        test = Image.open(requests.get(test_img_url, stream=True).raw).convert("RGB")
-
-        scores = []
+        scores = [
+            self.score_grams(grams=grams)
+            for grams in self.choice_grams(choices=choices)
+        ]
+
+        ranked = sorted(scores, reverse=True)
+        if not ranked or ranked[0] <= 0:
+            margin = 0.0
+        elif len(ranked) == 1:
+            margin = 1.0
+        else:
+            margin = (ranked[0] - ranked[1]) / ranked[0]
 
-        # For each control image from the image bank
-        for control in controls:
-            print(
-                "\r, "
-                f"Testing test image against {highway_code_image_dict.get(control)}",
-                end="",
-            )
+        return scores, margin
 
-            # Load the control image
-            control_img = Image.open(requests.get(control, stream=True).raw).convert(
-                "RGB"
-            )
 
-            # Compute a score
-            img_score = ImageComparison().image_comparison(
-                image_one=test, image_two=control_img
-            )
+class SemanticRanker:
+    """
+    Class ranks multiple choices by the similarity of their word vectors to the
+    question and the answer, for when the choices and the answer share few words.
+    Texts are embedded with a spaCy model with word vectors, in one nlp.pipe call per
+    batch, and kept as unit-length rows of a matrix, so ranking is a single matrix
+    product. The embeddings of known texts can be saved to disk and memory-mapped.
 
-            # Append the score to the overall scores list
-            scores.append(img_score)
+    """
 
-        # Make a dictionary of the scores and the image urls
-        scores_dict = dict(zip(scores, controls))
+    def __init__(
+        self,
+        model: str = "en_core_web_md",
+        weights: dict = None,
+        cache_size: int = 4096,
+    ):
+        self.model = model
+        self.weights = (
+            weights if weights is not None else {"question": 0.25, "answer": 0.75}
+        )
+        self.cache_size = cache_size
+        self.nlp = None
+        self.lock = threading.Lock()
+        # Texts embedded at runtime, most recently used last
+        self.embeddings = OrderedDict()
+        # Texts precomputed or loaded from disk, as rows of a matrix
+        self.rows = {}
+        self.matrix = None
+
+    def load_model(self):
+        """
+        Loads the spaCy model the first time it is needed. Only the components needed
+        for the vectors are run, on the CPU.
 
-        # Compute the minimum score
-        min_score = min(scores)
+        Returns
+        -------
+        The spaCy Language.
 
-        # If the min score is less than the threshold, return the caption
-        if min_score < threshold:
-            return highway_code_image_dict.get(scores_dict.get(min_score))
+        """
+        if self.nlp is None:
+            self.nlp = spacy.load(
+                self.model, exclude=["parser", "ner", "lemmatizer", "textcat"]
+            )
+            if not self.nlp.vocab.vectors.shape[0]:
+                logging.warning(
+                    f"The spaCy model {self.model} has no word vectors, "
+                    "so every choice will score the same"
+                )
 
-        # Else, the image caption cannot be found
-        else:
-            no_caption_outcome = "No caption found"
-            return no_caption_outcome
+        return self.nlp
 
-    def detect_shape(self, image_url: str) -> str:
+    def embed_many(self, texts: list) -> np.ndarray:
         """
-        Detects the shape of an image. Note that this is a simple method
-        and can only detect shapes of images that are regular: circle, rectangle, pentagon,
-        square etc.
+        Embeds several texts. Texts that have not been embedded before are run through
+        spaCy together in one pass.
 
         Parameters
         ----------
-        image_url: str, the url of the image to be tested.
+        texts: list, a list of the texts.
 
         Returns
         -------
-        A string with the shape of the image.
+        An array with a unit-length row per text; rows of texts without vectors are
+        zeros.
 
         """
-        # Open image with pillow
-        image = Image.open(requests.get(image_url, stream=True).raw).convert("RGB")
+        found = {}
+        with self.lock:
+            for text in texts:
+                if text in self.rows:
+                    found[text] = self.matrix[self.rows[text]]
+                elif text in self.embeddings:
+                    found[text] = self.embeddings[text]
+                    self.embeddings.move_to_end(text)
+
+        unseen = list(dict.fromkeys(text for text in texts if text not in found))
+        if unseen:
+            docs = self.load_model().pipe(unseen)
+            vectors = np.array([doc.vector for doc in docs], dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.maximum(norms, 1e-12)
+
+            with self.lock:
+                for text, vector in zip(unseen, vectors):
+                    found[text] = vector
+                    self.embeddings[text] = vector
+                while len(self.embeddings) > self.cache_size:
+                    self.embeddings.popitem(last=False)
+
+        return np.array([found[text] for text in texts], dtype=np.float32)
+
+    def precompute(self, texts: list):
+        """
+        Embeds texts that are known up front, eg the Highway Code passages and the
+        captions of the sign bank, and keeps them for the life of the ranker.
 
-        # Convert the image into an array
-        image_array = io.imread(image_url)
+        Parameters
+        ----------
+        texts: list, a list of the texts.
 
-        # Convert the image array into grayscale
-        gray = cv2.cvtColor(np.float32(image), cv2.COLOR_RGB2GRAY).astype("uint8")
+        Returns
+        -------
 
-        # Compute the threshold
-        ret, thresh = cv2.threshold(gray, 127, 255, 1)
+        """
+        texts = [text for text in dict.fromkeys(texts) if text not in self.rows]
+        if not texts:
+            return
+
+        vectors = self.embed_many(texts=texts)
+        with self.lock:
+            known = list(self.rows)
+            matrix = (
+                vectors if self.matrix is None else np.vstack([self.matrix, vectors])
+            )
+            self.rows = {text: row for row, text in enumerate(known + texts)}
+            self.matrix = matrix
 
-        # Find the contours
-        contours, h = cv2.findContours(thresh, 1, 2)
+    def save(self, path: str):
+        """
+        Saves the precomputed embeddings to a directory, as an (N, D) .npy matrix and
+        a JSON table of the texts of its rows. Each file is written to a temporary
+        name first and moved into place, with the table last.
 
-        # For each contour
-        shape = []
-        for contour in contours:
-            # Approximate the shape
-            approx = cv2.approxPolyDP(
-                contour, 0.01 * cv2.arcLength(contour, True), True
-            )
-            if len(approx) == 5:
-                shape.append("pentagon")
-                cv2.drawContours(image_array, [contour], 0, 255, -1)
-            elif len(approx) == 3:
-                shape.append("triangle")
-                cv2.drawContours(image_array, [contour], 0, (0, 255, 0), -1)
-            elif len(approx) == 4:
-                shape.append("square")
-                cv2.drawContours(image_array, [contour], 0, (0, 0, 255), -1)
-            elif len(approx) == 9:
-                shape.append("half-circle")
-                cv2.drawContours(image_array, [contour], 0, (255, 255, 0), -1)
-            elif len(approx) > 15:
-                shape.append("circle")
-                cv2.drawContours(image_array, [contour], 0, (0, 255, 255), -1)
+        Parameters
+        ----------
+        path: str, the directory to save the embeddings to.
 
-        return shape[0]
+        Returns
+        -------
 
+        """
+        os.makedirs(path, exist_ok=True)
+
+        with self.lock:
+            texts = sorted(self.rows, key=self.rows.get)
+            matrix = self.matrix if self.matrix is not None else np.zeros((0, 0))
+
+        def replace(filename: str, write):
+            temp_path = os.path.join(path, f".{filename}.tmp")
+            with open(temp_path, "wb") as f:
+                write(f)
+            os.replace(temp_path, os.path.join(path, filename))
+
+        replace("embeddings.npy", lambda f: np.save(f, matrix.astype(np.float32)))
+        replace(
+            "texts.json",
+            lambda f: f.write(
+                json.dumps({"model": self.model, "texts": texts}).encode("utf-8")
+            ),
+        )
 
-class ImageAnswers:
-    """
-    Class attempts to obtain the answers for image questions.
+    @classmethod
+    def load(cls, path: str, **kwargs):
+        """
+        Opens embeddings saved with the func save. The matrix is memory-mapped rather
+        than read.
 
-    """
-    def __init__(self):
-        pass
+        Parameters
+        ----------
+        path: str, the directory the embeddings were saved to.
+        kwargs: any other params of the ranker.
+
+        Returns
+        -------
+        A SemanticRanker.
 
-    def image_answer(
-        self, image_urls: list, highway_code_image_dict: dict, question: str
-    ):
         """
-        Obtains the answer from the image answers. Uses the ImageComparison
-        class to obtain a caption for the images in the image_urls param.
+        with open(os.path.join(path, "texts.json")) as f:
+            saved = json.load(f)
+
+        ranker = cls(model=saved["model"], **kwargs)
+        matrix = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        if len(matrix) != len(saved["texts"]):
+            raise ValueError(f"The embeddings at {path} do not match their texts")
+        if saved["texts"]:
+            ranker.matrix = matrix
+            ranker.rows = {text: row for row, text in enumerate(saved["texts"])}
+
+        return ranker
+
+    def score(
+        self, question: str, answer: str, choices: list, passages: list = None
+    ) -> tuple:
+        """
+        Scores every choice by its cosine similarity to the question and the answer.
+        The question, the answer and all of the choices are embedded in one pass.
+        If the answer was joined from Highway Code passages, its vector is the mean
+        of theirs, so the precomputed embeddings of the passages are used rather than
+        the joined text being embedded again.
 
         Parameters
         ----------
-        image_urls: list, a list of the image_urls on the page.
-        highway_code_image_dict: dict, the image bank to be used.
         question: str, the question being asked.
+        answer: str, the answer, scraped from the web or the Highway Code.
+        choices: list, a list of the choices.
+        passages: list, the passages the answer was joined from, if any.
 
         Returns
         -------
-        A string with the answer to the question
+        A list of scores, one per choice, and the margin of the best score over the
+        second best as a fraction of the best; 0.0 if the best is tied or not positive.
 
         """
-        captions = []
-
-        # For each image url, obtain a caption
-        for image_url in image_urls:
-            threshold = 10
-            caption = ImageComparison().get_sign_meaning(
-                highway_code_image_dict=highway_code_image_dict,
-                test_img_url=image_url,
-                threshold=threshold,
+        if passages:
+            vectors = self.embed_many(texts=[question] + choices + list(passages))
+            answer_vector = vectors[1 + len(choices) :].mean(axis=0)
+            answer_vector /= max(np.linalg.norm(answer_vector), 1e-12)
+            vectors = np.vstack(
+                [vectors[:1], answer_vector, vectors[1 : 1 + len(choices)]]
             )
+        else:
+            answer = CorrectAnswer().remove_question_from_answer(
+                text=answer, question=question
+            )
+            vectors = self.embed_many(texts=[question, answer] + choices)
 
-            captions.append(caption)
-
-        # Make a dictionary of captions and their corresponding urls
-        captions_dict = dict(zip(captions, image_urls))
+        # (choices, D) x (D, 2) cosine similarities, weighted into one score each
+        weights = np.array(
+            [self.weights["question"], self.weights["answer"]], dtype=np.float32
+        )
+        scores = (vectors[2:] @ vectors[:2].T) @ weights
+        scores = [round(float(score), 6) for score in scores]
+
+        ranked = sorted(scores, reverse=True)
+        if not ranked or ranked[0] <= 0:
+            margin = 0.0
+        elif len(ranked) == 1:
+            margin = 1.0
+        else:
+            margin = (ranked[0] - ranked[1]) / ranked[0]
 
-        # Make topics from the question
-        question_topics = CorrectAnswer().prepare_text_for_lda(text=question)
+        return scores, margin
 
-        # Obtain the answer
-        try:
-            answer = [s for s in captions if any(xs in s for xs in question_topics)][0]
-            answer_outcome = "Answer obtained"
-            return answer, captions_dict, answer_outcome
-        except:
-            # In the event that an answer cannot be obtained
-            answer = ""
-            answer_outcome = "No answer obtained"
-            return answer, captions_dict, answer_outcome
 
-    def update_choices_dict(self, captions: list) -> dict:
-        """
-        Updates the choices_dict to contain the captions obtained from the func
-        image_answer.
+def shared_semantic_ranker() -> SemanticRanker:
+    """
+    Returns the SemanticRanker shared by the module, making it the first time it is
+    asked for.
 
-        Parameters
-        ----------
-        captions: list, a list of captions for the images obtained.
+    Returns
+    -------
+    A SemanticRanker.
 
-        Returns
-        -------
-        A dict with the captions and the their corresponding question keys.
+    """
+    global semantic_ranker
 
-        """
-        # Make a keys list
-        keys = ["questions-0", "questions-1", "questions-2", "questions-3"]
+    if semantic_ranker is None:
+        semantic_ranker = SemanticRanker()
 
-        return dict(zip(captions, keys))
+    return semantic_ranker
 
 
 class CorrectAnswer:
@@ -667,18 +5440,7 @@ class CorrectAnswer:
         A list of the text split up.
 
         """
-        lda_tokens = []
-        tokens = parser(text)
-        for token in tokens:
-            if token.orth_.isspace():
-                continue
-            elif token.like_url:
-                lda_tokens.append("URL")
-            elif token.orth_.startswith("@"):
-                lda_tokens.append("SCREEN_NAME")
-            else:
-                lda_tokens.append(token.lower_)
-        return lda_tokens
+        return shared_text_pipeline().tokenize(text)
 
     def get_lemma(self, word: str) -> str:
         """
@@ -693,11 +5455,7 @@ class CorrectAnswer:
         A string with the meaning of the word returned.
 
         """
-        lemma = wn.morphy(word)
-        if lemma is None:
-            return word
-        else:
-            return lemma
+        return shared_text_pipeline().lemma(word)
 
     def get_lemma2(self, word):
         """
@@ -727,14 +5485,7 @@ class CorrectAnswer:
         A list of words that are the topics of the initial text input.
 
         """
-        nltk.download("stopwords")
-        en_stop = set(nltk.corpus.stopwords.words("english"))
-
-        tokens = CorrectAnswer.tokenize(self, text)
-        tokens = [token for token in tokens if len(token) > 4]
-        tokens = [token for token in tokens if token not in en_stop]
-        tokens = [CorrectAnswer.get_lemma(self, token) for token in tokens]
-        return tokens
+        return shared_text_pipeline().prepare(text)
 
     def unicode_to_ascii(self, string: str) -> str:
         """
@@ -885,12 +5636,12 @@ class CorrectAnswer:
         )
         answer_processed = CorrectAnswer().prepare_text_for_lda(text=answer)
 
-        score = 0
-        for processed_choice in choice_processed:
-            print(processed_choice)
-            score += answer_processed.count(processed_choice)
+        # Count the processed choice tokens in the processed answer in one scan
+        counts = PatternMatcher(choice_processed).count(
+            text=" ".join(answer_processed), whole_words=True
+        )
 
-        return score
+        return sum(counts[processed_choice] for processed_choice in choice_processed)
 
     def gram_answer_method(self, choice: str, answer: str, question: str) -> int:
         """
@@ -905,33 +5656,23 @@ class CorrectAnswer:
 
         Returns
         -------
-        A score based on the number of n-grams from the choice that appears in the question.
+        A score based on the number of n-grams from the choice that appears in the answer.
 
         """
-        # Process the answer
-        answer = CorrectAnswer().remove_question_from_answer(
-            text=answer, question=question
+        scores, _ = ScoringEngine(answer=answer, question=question).score(
+            choices=[choice]
         )
-        answer_processed = CorrectAnswer().prepare_text_for_lda(text=answer)
-
-        score = 0
-
-        grams = CorrectAnswer().get_grams(choice)
 
-        mult = {"unigrams": 1, "bigrams": 3, "complete": 10}
-
-        for gram_type in grams:
-            gram_type_score = 0
-
-            for gram in grams[gram_type]:
-                gram_type_score += answer_processed.count(gram)
-
-            score += mult[gram_type] * gram_type_score
-
-        return score
+        return scores[0]
 
     def obtain_correct_answer(
-        self, question: str, answer: str, choices_dict: dict
+        self,
+        question: str,
+        answer: str,
+        choices_dict: dict,
+        strategy: str = "gram",
+        ranker: SemanticRanker = None,
+        passages: list = None,
     ) -> str:
         """
         Attempts to obtain the correct answer from the multiple choice values and
@@ -943,6 +5684,13 @@ class CorrectAnswer:
         answer: str, the answer, scraped from the web.
         choices_dict: dict, makes a dictionary of the multiple choices per page.
         Obtained from the func make_choices_dict in the StartTest class.
+        strategy: str, how the choices are scored; 'gram' counts the words and
+        bigrams of each choice in the answer, 'semantic' compares the word vectors of
+        the choices with the question and the answer.
+        ranker: SemanticRanker, the ranker for the semantic strategy, by default the
+        one shared by the module.
+        passages: list, the Highway Code passages the answer was joined from, if any;
+        the semantic strategy uses their precomputed embeddings.
 
         Returns
         -------
@@ -952,56 +5700,74 @@ class CorrectAnswer:
         # Make a list of choices from the choices_dict
         choices = list(choices_dict.keys())
 
-        # For each choice, evaluate its score
-        scores = []
+        # Preprocess the question, the answer and all of the choices in one pass
+        shared_text_pipeline().prepare_many(
+            [
+                question,
+                CorrectAnswer().remove_question_from_answer(
+                    text=answer, question=question
+                ),
+            ]
+            + choices
+        )
 
-        for choice in choices:
-            score = CorrectAnswer().gram_answer_method(
-                choice=choice, answer=answer, question=question
+        # Score every choice against the answer in one pass
+        if strategy == "semantic":
+            ranker = ranker if ranker is not None else shared_semantic_ranker()
+            scores, margin = ranker.score(
+                question=question, answer=answer, choices=choices, passages=passages
             )
-
-            scores.append(score)
+        elif strategy == "gram":
+            scores, margin = ScoringEngine(answer=answer, question=question).score(
+                choices=choices
+            )
+        else:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        logging.info(f"Choice scores: {scores}, margin: {margin:.2f}")
 
         # Make a dictionary of the choices and their scores
         score_dict = dict(zip(choices, scores))
 
         # Obtain the correct answer from the highest score given
         correct_answer = ""
+        max_score = max(scores) if scores else 0
 
         # Evaluate if the score_dict contains duplicate scores
-        duplicate_answers = []
-        for choice, score in score_dict.items():
-            if score == max(list(score_dict.values())):
-                duplicate_answers.append(choice)
+        duplicate_answers = [
+            choice for choice, score in score_dict.items() if score == max_score
+        ]
 
         if len(duplicate_answers) > 1:
-            print("Duplicate answers detected, using regex to find the answer")
-            # If there are multiple duplicate_answers
-            duplicate_answer_scores = {}
-
-            for duplicate_answer in duplicate_answers:
-                # Process the answer
-                duplicate_answer_processed = CorrectAnswer().prepare_text_for_lda(text=duplicate_answer)
-
-                scores = []
-                for dap in duplicate_answer_processed:
-                    # Give each duplicate_answer a score based on all matches in the answer
-                    score = len(re.findall(dap, answer))
-                    scores.append(score)
-
-                scores = sum(scores)
+            print("Duplicate answers detected, matching them against the answer")
+            # If there are multiple duplicate_answers, process them in one pass
+            duplicate_answers_processed = shared_text_pipeline().prepare_many(
+                duplicate_answers
+            )
 
-                # Make a dictionary of scores
-                duplicate_answer_scores[duplicate_answer] = scores
+            # Find every token of every duplicate_answer in the answer in one scan
+            matcher = PatternMatcher(
+                [dap for processed in duplicate_answers_processed for dap in processed]
+            )
+            counts = matcher.count(text=answer)
 
+            # Give each duplicate_answer a score based on all matches in the answer
+            duplicate_answer_scores = {}
+            for duplicate_answer, duplicate_answer_processed in zip(
+                duplicate_answers, duplicate_answers_processed
+            ):
+                duplicate_answer_scores[duplicate_answer] = sum(
+                    counts[dap] for dap in duplicate_answer_processed
+                )
+
+            max_duplicate_score = max(duplicate_answer_scores.values())
             for choice, score in duplicate_answer_scores.items():
-                if score == max(list(duplicate_answer_scores.values())):
+                if score == max_duplicate_score:
                     correct_answer = choice
         else:
             # If there are no duplicate answers, choose the answer with the
             # highest score
             for choice, score in score_dict.items():
-                if score == max(list(score_dict.values())):
+                if score == max_score:
                     correct_answer = choice
 
         # If the correct_answer is still empty, choose a random one
@@ -1240,6 +6006,409 @@ class StartTest:
         driver.find_element_by_class_name(end_button_id).click()
 
 
+class BatchSolver:
+    """
+    Class answers one question at a time with the pipeline shared by the func
+    evaluate_per_page in main.py and the func solve_batch: a caption for the image of
+    the question from the sign bank, captions or shapes for image choices, an answer
+    from the Highway Code or a web search, and then the func obtain_correct_answer.
+    The browser passes an image_search callable to search Google for images the
+    sign bank cannot caption; without one, as in a batch, that step is skipped.
+
+    """
+
+    def __init__(
+        self,
+        sign_bank: SignBank = None,
+        knowledge_base: HighwayCodeIndex = None,
+        ranker: SemanticRanker = None,
+        web_search: bool = True,
+        threshold: int = SIGN_MATCH_THRESHOLD,
+        latency_budget: float = 10.0,
+        min_search_budget: float = 2.0,
+        sign_meaning_cache: SignMeaningCache = None,
+        image_search=None,
+    ):
+        self.sign_bank = sign_bank
+        self.knowledge_base = knowledge_base
+        self.ranker = ranker
+        self.web_search = web_search
+        self.threshold = threshold
+        self.latency_budget = latency_budget
+        # The fewest seconds the web search is given, however long the earlier
+        # stages took
+        self.min_search_budget = min_search_budget
+        self.sign_meaning_cache = sign_meaning_cache
+        # A callable taking an image url and returning its caption, or None
+        self.image_search = image_search
+
+    def image_caption(self, image_url: str) -> tuple:
+        """
+        Obtains the caption of the image of a question, matching its pixels, then its
+        keypoints, then with the image_search callable, if any. If none of them find
+        a caption, the closest caption in the bank is used, however weakly it
+        matches.
+
+        Parameters
+        ----------
+        image_url: str, the url of the image.
+
+        Returns
+        -------
+        The caption and the method that found it.
+
+        """
+        for strategy, method in [("pixel", "sign_bank"), ("orb", "orb")]:
+            caption = ImageComparison().get_sign_meaning(
+                highway_code_image_dict=self.sign_bank,
+                test_img_url=image_url,
+                threshold=self.threshold,
+                strategy=strategy,
+                cache=self.sign_meaning_cache,
+            )
+            logging.info(f"Caption from {method}: {caption}")
+            if caption != "No caption found":
+                return caption, method
+
+        if self.image_search is not None:
+            caption = self.image_search(image_url)
+            logging.info(f"Caption from the image search: {caption}")
+            if caption is not None:
+                return caption, "image_search"
+
+        logging.info("Using the closest caption in the image bank")
+        caption = ImageComparison().get_sign_meaning(
+            highway_code_image_dict=self.sign_bank,
+            test_img_url=image_url,
+            threshold=float("inf"),
+            cache=self.sign_meaning_cache,
+        )
+
+        return caption, "sign_bank_partial"
+
+    def image_choices(self, question: str, image_urls: list, choices_dict: dict) -> dict:
+        """
+        Captions the images of choices that are images rather than text; with their
+        shapes if the question is about shapes, else with the sign bank.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        image_urls: list, the urls of the images of the choices.
+        choices_dict: dict, the choices_dict of the page.
+
+        Returns
+        -------
+        The choices_dict with the captions as the choices, or the choices_dict param
+        if the images could not be captioned.
+
+        """
+        if StartTest().identify_shape_question(question=question):
+            logging.info("Looks like a shape question is detected")
+            shapes = [
+                ImageComparison().detect_shape(image_url=image_url)
+                for image_url in image_urls
+            ]
+            return ImageAnswers().update_choices_dict(captions=shapes)
+
+        if self.sign_bank is None:
+            return choices_dict
+
+        _, captions_dict, answer_outcome = ImageAnswers().image_answer(
+            image_urls=image_urls,
+            highway_code_image_dict=self.sign_bank,
+            question=question,
+            cache=self.sign_meaning_cache,
+        )
+        logging.info(answer_outcome)
+        if answer_outcome == "Answer obtained":
+            return ImageAnswers().update_choices_dict(
+                captions=list(captions_dict.keys())
+            )
+
+        return choices_dict
+
+    def text_answer(self, question: str, deadline: float = None) -> tuple:
+        """
+        Obtains an answer to a question from the Highway Code, or a web search if the
+        Highway Code is not confident. If the search does not answer before the
+        deadline, the closest Highway Code passages are used, however weakly they
+        match.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        deadline: float, the time.monotonic() by which to have answered, if any.
+
+        Returns
+        -------
+        The answer, or None if no answer was found, the method that found it and the
+        Highway Code passages it was joined from, if any.
+
+        """
+        if self.knowledge_base is not None:
+            passages = self.knowledge_base.retrieve(question=question)
+            if passages is not None:
+                return " ".join(passages), "knowledge_base", passages
+
+        if self.web_search:
+            budget = None
+            if deadline is not None:
+                budget = max(deadline - time.monotonic(), self.min_search_budget)
+            try:
+                answer = AnswerSearch().answer_search(question=question, budget=budget)
+                return answer, "web_search", None
+            except Exception as e:
+                logging.info(f"No answer found with a web search: {e}")
+
+        if self.knowledge_base is not None:
+            passages = self.knowledge_base.retrieve(question=question, min_score=0.0)
+            if passages is not None:
+                return " ".join(passages), "knowledge_base_partial", passages
+
+        return None, None, None
+
+    def answer(
+        self,
+        question: str,
+        choices_dict: dict,
+        image_url: str = None,
+        image_urls: list = None,
+        deadline: float = None,
+    ) -> tuple:
+        """
+        Answers one question. Questions with an image are answered with its caption;
+        the rest, including those whose choices are images, with the Highway Code or
+        a web search.
+
+        Parameters
+        ----------
+        question: str, the question being asked.
+        choices_dict: dict, the choices and their ids, as made by the func
+        make_choices_dict in the StartTest class.
+        image_url: str, the url of the image of the question, if any.
+        image_urls: list, the urls of the images of the choices, if they are images.
+        deadline: float, the time.monotonic() by which to have answered; by default
+        latency_budget seconds from now.
+
+        Returns
+        -------
+        The chosen answer, the choices_dict it is a key of, as image choices are
+        replaced by their captions, and the method that produced the answer.
+
+        """
+        if deadline is None and self.latency_budget is not None:
+            deadline = time.monotonic() + self.latency_budget
+        passages = None
+
+        if image_url and self.sign_bank is not None:
+            answer, method = self.image_caption(image_url=image_url)
+        else:
+            if image_urls:
+                choices_dict = self.image_choices(
+                    question=question, image_urls=image_urls, choices_dict=choices_dict
+                )
+            answer, method, passages = self.text_answer(
+                question=question, deadline=deadline
+            )
+
+        if answer is None:
+            logging.info("It looks an answer cannot be obtained, choosing a random one")
+            answer = CorrectAnswer().random_answer(choices_dict=choices_dict)
+            method = "random"
+
+        correct_answer = CorrectAnswer().obtain_correct_answer(
+            question=question,
+            answer=answer,
+            choices_dict=choices_dict,
+            strategy="gram" if self.ranker is None else "semantic",
+            ranker=self.ranker,
+            passages=passages,
+        )
+
+        return correct_answer, choices_dict, method
+
+    def solve(self, record: dict) -> dict:
+        """
+        Answers one question of a question set.
+
+        Parameters
+        ----------
+        record: dict, with the keys question and choices, and optionally image_url,
+        the url of the image of the question, or image_urls, the urls of the images
+        of the choices.
+
+        Returns
+        -------
+        A dict with the question, the answer, the index of the choice that was
+        answered and the method that produced the answer.
+
+        """
+        question = record["question"]
+        image_urls = record.get("image_urls") or []
+        choices = list(record.get("choices") or [""] * len(image_urls))
+
+        correct_answer, choices_dict, method = self.answer(
+            question=question,
+            choices_dict=ImageAnswers().update_choices_dict(captions=choices),
+            image_url=record.get("image_url"),
+            image_urls=image_urls,
+        )
+
+        return {
+            "question": question,
+            "answer": correct_answer,
+            "choice": int(choices_dict[correct_answer].split("-")[1]),
+            "method": method,
+        }
+
+
+def init_batch_worker(
+    sign_bank_path: str = None,
+    knowledge_base_path: str = None,
+    embeddings_path: str = None,
+    answer_strategy: str = "gram",
+    web_search: bool = True,
+    http_cache_path: str = None,
+):
+    """
+    Makes the BatchSolver of a worker process of the func solve_batch. The sign bank
+    is memory-mapped from its saved artifact, so the workers share one copy of it
+    through the page cache.
+
+    Parameters
+    ----------
+    sign_bank_path: str, the directory of a bank saved with the func save of the
+    SignBank class.
+    knowledge_base_path: str, the JSON file of a saved HighwayCodeIndex.
+    embeddings_path: str, the directory of embeddings saved with the func save of
+    the SemanticRanker class.
+    answer_strategy: str, how the choices are ranked, 'gram' or 'semantic'.
+    web_search: bool, whether to search the web when the Highway Code is not
+    confident.
+    http_cache_path: str, the directory of an HTTPCache shared by the workers.
+
+    Returns
+    -------
+
+    """
+    global batch_solver
+
+    if http_cache_path:
+        use_http_cache(path=http_cache_path)
+
+    ranker = None
+    if answer_strategy == "semantic":
+        if embeddings_path and os.path.exists(
+            os.path.join(embeddings_path, "texts.json")
+        ):
+            ranker = SemanticRanker.load(embeddings_path)
+        else:
+            ranker = SemanticRanker()
+
+    batch_solver = BatchSolver(
+        sign_bank=SignBank.load(sign_bank_path) if sign_bank_path else None,
+        knowledge_base=(
+            HighwayCodeIndex.load(knowledge_base_path) if knowledge_base_path else None
+        ),
+        ranker=ranker,
+        web_search=web_search,
+    )
+
+
+def solve_batch_record(index: int, record: dict) -> dict:
+    """
+    Answers one question in a worker process of the func solve_batch, with the
+    BatchSolver made by the func init_batch_worker.
+
+    Parameters
+    ----------
+    index: int, the position of the record in the batch.
+    record: dict, the question, as for the func solve of the BatchSolver class.
+
+    Returns
+    -------
+    The dict from the func solve, with the index added, or with an error instead of
+    an answer if the question could not be answered.
+
+    """
+    try:
+        result = batch_solver.solve(record=record)
+    except Exception as e:
+        result = {"question": record.get("question"), "error": repr(e)}
+    result["index"] = index
+
+    return result
+
+
+def solve_batch(
+    records,
+    sign_bank_path: str = None,
+    knowledge_base_path: str = None,
+    embeddings_path: str = None,
+    answer_strategy: str = "gram",
+    web_search: bool = True,
+    http_cache_path: str = None,
+    max_workers: int = None,
+    max_pending: int = None,
+):
+    """
+    Answers many questions without a browser, over a pool of processes, yielding the
+    results as they complete rather than in order. Records are read lazily, with at
+    most max_pending questions submitted at once, so a large question set is never
+    held in memory.
+
+    Parameters
+    ----------
+    records: an iterable of dicts, as for the func solve of the BatchSolver class.
+    sign_bank_path: str, the directory of a saved sign bank; image questions are
+    answered by text alone without it.
+    knowledge_base_path: str, the JSON file of a saved HighwayCodeIndex.
+    embeddings_path: str, the directory of saved embeddings for the semantic
+    strategy.
+    answer_strategy: str, how the choices are ranked, 'gram' or 'semantic'.
+    web_search: bool, whether to search the web when the Highway Code is not
+    confident.
+    http_cache_path: str, the directory of an HTTPCache shared by the workers.
+    max_workers: int, the number of processes, by default one per core.
+    max_pending: int, the most questions submitted at once, by default four per
+    process.
+
+    Returns
+    -------
+    A generator of result dicts, each with the index of its record.
+
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 4 * max_workers
+
+    # Spawn rather than fork the workers, so that they do not inherit the locks,
+    # threads and connections of the parent
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_batch_worker,
+        initargs=(
+            sign_bank_path,
+            knowledge_base_path,
+            embeddings_path,
+            answer_strategy,
+            web_search,
+            http_cache_path,
+        ),
+    ) as executor:
+        pending = set()
+        for index, record in enumerate(records):
+            pending.add(executor.submit(solve_batch_record, index, record))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        for future in as_completed(pending):
+            yield future.result()
+
+
 class Logging:
     """
     Logs all messages and outputs from the bot.
@@ -2,9 +2,29 @@
 import driving_theory
 from IPython.display import clear_output
 import logging
+import argparse
+import json
+import os
+import time
+
+HIGHWAY_CODE_URL = "https://www.gov.uk/guidance/the-highway-code/traffic-signs"
+# The most seconds to spend on a question before using the best evidence so far
+QUESTION_LATENCY_BUDGET = 10.0
+# The fewest seconds the web search is given, however long the earlier stages took
+MIN_SEARCH_BUDGET = 2.0
+# Where the index of the Highway Code text is saved, unless another path is given
+KNOWLEDGE_BASE_PATH = "knowledge_base.json"
+
 
 # Functions
-def evaluate_per_page(driver, highway_code_image_dict: dict):
+def evaluate_per_page(
+    driver,
+    sign_bank,
+    sign_meaning_cache=None,
+    knowledge_base=None,
+    answer_store=None,
+    ranker=None,
+):
     """
     Evaluates an answer to a question given some multiple choices per page in the following
     fashion:
@@ -19,14 +39,23 @@ def evaluate_per_page(driver, highway_code_image_dict: dict):
     Parameters
     ----------
     driver: the selenium driver used to open the webpage and start the test.
-    highway_code_image_dict: dict, an image bank of dicts obtained from
+    sign_bank: SignBank, the bank of Highway Code images, loaded once from
     the Highway Code website.
+    sign_meaning_cache: SignMeaningCache, a cache of previously identified signs.
+    knowledge_base: HighwayCodeIndex, a local index of the Highway Code text to
+    retrieve answers from before searching the web.
+    answer_store: AnswerStore, a store of previous answers to check first.
+    ranker: SemanticRanker, if given, the choices are ranked by word vectors
+    rather than by word overlap.
 
     Returns
     -------
     A page evaluate with an answer chosen.
 
     """
+    # Start the latency budget of the question
+    deadline = time.monotonic() + QUESTION_LATENCY_BUDGET
+
     # Identify the question
     logging.info("Identifying the questions")
     question_class_name = "govuk-fieldset__heading"
@@ -54,178 +83,87 @@ def evaluate_per_page(driver, highway_code_image_dict: dict):
     image_detection, image_body = driving_theory.ImageDetection().detect_image_question(
         driver=driver, image_xpath=image_xpath
     )
-    if image_detection:
-        logging.info("Image on page detected")
-        # If there is an image detected, obtain its URL
-        logging.info("Obtaining its URL")
-        image_url = driving_theory.ImageDetection().get_image_url(image_body=image_body)
-
-        # Lets see if we can use the ImageComparison class to obtain a caption
-        # Obtain an initial answer
-        logging.info("Obtaining an answer for the image")
-        threshold = 10
-        answer = driving_theory.ImageComparison().get_sign_meaning(
-            highway_code_image_dict=highway_code_image_dict,
-            test_img_url=image_url,
-            threshold=threshold,
-        )
-        logging.info(answer)
-
-        # If the initial method doesnt find an answer, use the ImageSearch class
-        if answer == "No caption found":
-            logging.info("No caption found for the image, opening a new tab")
-            # Make a new tab
-            driving_theory.ImageSearch().new_tab(driver=driver)
-
-            # Switch control to the new tab opened
-            logging.info("Switching control to new tab")
-            driving_theory.ImageSearch().switch_tab(driver=driver)
-
-            # Open Google Image Search in the new tab
-            logging.info("Performing Google search")
-            driver.get("https://www.google.com/imghp?hl=EN")
 
-            # Accept the cookies
-            try:
-                logging.info("Accepting the cookies")
-                accept_button_xpath = '//*[@id="L2AGLb"]'
-                driving_theory.ImageSearch().accept_google_search_cookies(
-                    driver=driver, accept_button_xpath=accept_button_xpath, wait_time=1
-                )
-            except:
-                logging.info(
-                    "Looks like the cookies have already been accepted, continuing"
+    # Check whether the question has been answered before. Questions whose
+    # choices are images cannot be told apart by their text, so are not stored
+    answer_context = None
+    if answer_store is not None and not driving_theory.StartTest().evaluate_choices_dict(
+        choices_dict=choices_dict
+    ):
+        answer_context = ""
+        if image_detection:
+            answer_context = answer_store.image_context(
+                image_url=driving_theory.ImageDetection().get_image_url(
+                    image_body=image_body
                 )
-                # Note that if an exception is returned, it means that
-                # cookies are already accepted
-                pass
-
-            # Search for the image and obtain an answer
-            logging.info("Searching for the answer to the image")
-            cam_button_xpath = '//*[@id="sbtc"]/div/div[3]/div[2]/span'
-            url_tab_xpath = '//*[@id="dRSWfb"]/div/div'
-            image_url_id = "Ycyxxc"
-            search_button_id = "RZJ9Ub"
-            first_answer_xpath = '//*[@id="topstuff"]/div/div[2]/a'
-            answer = driving_theory.ImageSearch().image_search(
-                driver=driver,
-                image_url_path=image_url,
-                cam_button_xpath=cam_button_xpath,
-                url_tab_xpath=url_tab_xpath,
-                image_url_id=image_url_id,
-                search_button_id=search_button_id,
-                first_answer_xpath=first_answer_xpath,
             )
-            logging.info(answer)
-
-            # Close the tab opened
-            logging.info("Closing the tab")
-            driving_theory.ImageSearch().close_tab(driver=driver)
-
-            # Switch back control to the original tab
-            logging.info("Giving back control to the original tab")
-            driving_theory.ImageSearch().switch_to_original_tab(driver=driver)
-        else:
-            logging.info("Looks like the initial image answering method worked")
-            # If the initial method using the ImageComparison class worked,
-            # just use that as the answer
-            answer = answer
-            logging.info(answer)
-    else:
-        logging.info("Evaluating the choices_dict created")
-        choices_dict_eval = driving_theory.StartTest().evaluate_choices_dict(
-            choices_dict=choices_dict
+        stored = answer_store.lookup(
+            question=question, choices=list(choices_dict.keys()), context=answer_context
         )
-        logging.info(choices_dict_eval)
-
-        if choices_dict_eval:
-            logging.info("Looks like there are empty strings in the choices_dict")
-            logging.info(
-                "This means that the answers do not contain text, they contain images"
+        # Fall back on a previous question worded slightly differently
+        if stored is None:
+            stored = answer_store.lookup_similar(
+                question=question,
+                choices=list(choices_dict.keys()),
+                context=answer_context,
             )
-            # If the choices_dict_eval is True - it contains empty strings
-            image_answers_class_name = "choice-image"
-            logging.info("Obtaining the image urls of the answers")
-            image_urls = driving_theory.ImageDetection().detect_image_answers(
-                driver=driver, image_answers_class_name=image_answers_class_name
-            )
-
-            # Identify whether the question being asked is a shape one
-            logging.info("Identifying whether the question being asked is a shape one")
-            shape_question = driving_theory.StartTest().identify_shape_question(
-                question=question
+        if (
+            stored is not None
+            and answer_store.replayable(stored=stored)
+            and stored["answer"] in choices_dict
+        ):
+            logging.info(f"Answering from the answer store: {stored}")
+            driving_theory.StartTest().click_answer(
+                driver=driver, correct_answer=stored["answer"], choices_dict=choices_dict
             )
+            clear_output(wait=True)
+            logging.info(' ')
+            return
 
-            if shape_question:
-                logging.info("Looks like a shape question is detected")
-                shapes = []
-
-                logging.info("Obtaining the shapes for the images")
-                for image_url in image_urls:
-                    shape = driving_theory.ImageComparison().detect_shape(
-                        image_url=image_url
-                    )
-                    shapes.append(shape)
-
-                logging.info("Updating the choices_dict with the images shapes")
-                choices_dict = driving_theory.ImageAnswers().update_choices_dict(
-                    captions=shapes
-                )
-            else:
-                logging.info(
-                    "Attempting to obtain an answer, a captions_dict and the answers_outcome"
-                )
-                (
-                    answer,
-                    captions_dict,
-                    answer_outcome,
-                ) = driving_theory.ImageAnswers().image_answer(
-                    image_urls=image_urls,
-                    highway_code_image_dict=highway_code_image_dict,
-                    question=question,
-                )
-                logging.info(answer_outcome)
-                logging.info(answer)
-
-                # Update the choices_dict accordingly
-                if answer_outcome == "Answer obtained":
-                    logging.info("Looks like an answer was obtained")
-                    # If an answer is obtained then update the choices_dict
-                    logging.info("Obtaining a list of captions")
-                    captions = list(captions_dict.keys())
-                    logging.info(captions)
-
-                    logging.info("Updating the choices_dict")
-                    choices_dict = driving_theory.ImageAnswers().update_choices_dict(
-                        captions=captions
-                    )
-                else:
-                    logging.info(
-                        "An answer was not obtained, keeping the choices_dict the same"
-                    )
-                    # If no answer is obtained then do not change the choices_dict
-                    choices_dict = choices_dict
-
-        # If no image is detected, then use the AnswerSearch class instead
-        logging.info("Looks like there are no images detected")
-        try:
-            # Try to obtain the correct answer
-            logging.info("Attempting to obtain a correct answer")
-            answer = driving_theory.AnswerSearch().answer_search(question=question)
-        except:
-            logging.info("It looks an answer cannot be obtained, choosing a random one")
-            # If an answer cannot be obtained, choose a random one
-            answer = driving_theory.CorrectAnswer().random_answer(
-                choices_dict=choices_dict
-            )
+    # Obtain the urls of the image of the question, or of the images of the choices
+    image_url, image_urls = None, None
+    if image_detection:
+        logging.info("Image on page detected, obtaining its URL")
+        image_url = driving_theory.ImageDetection().get_image_url(image_body=image_body)
+    elif driving_theory.StartTest().evaluate_choices_dict(choices_dict=choices_dict):
+        logging.info("Looks like the answers do not contain text, they contain images")
+        logging.info("Obtaining the image urls of the answers")
+        image_urls = driving_theory.ImageDetection().detect_image_answers(
+            driver=driver, image_answers_class_name="choice-image"
+        )
 
-    # Obtain the correct answer amongst the choices
+    # Obtain the correct answer amongst the choices, with the same pipeline as a
+    # batch, but searching Google for images the sign bank cannot caption
     logging.info("Attempting to obtain a correct answer amongst the choices")
-    correct_answer = driving_theory.CorrectAnswer().obtain_correct_answer(
-        question=question, answer=answer, choices_dict=choices_dict
+    correct_answer, choices_dict, method = driving_theory.BatchSolver(
+        sign_bank=sign_bank,
+        knowledge_base=knowledge_base,
+        ranker=ranker,
+        latency_budget=QUESTION_LATENCY_BUDGET,
+        min_search_budget=MIN_SEARCH_BUDGET,
+        sign_meaning_cache=sign_meaning_cache,
+        image_search=lambda image_url: google_image_search(
+            driver=driver, image_url=image_url
+        ),
+    ).answer(
+        question=question,
+        choices_dict=choices_dict,
+        image_url=image_url,
+        image_urls=image_urls,
+        deadline=deadline,
     )
     logging.info(correct_answer)
 
+    # Remember the answer for the next time the question is asked
+    if answer_context is not None:
+        answer_store.record(
+            question=question,
+            choices=list(choices_dict.keys()),
+            answer=correct_answer,
+            method=method,
+            context=answer_context,
+        )
+
     # Click on the answer
     logging.info("Clicking on the answer")
     driving_theory.StartTest().click_answer(
@@ -235,7 +173,95 @@ def evaluate_per_page(driver, highway_code_image_dict: dict):
     logging.info(' ')
 
 
-def evaluate_all_pages(driver, highway_code_image_dict: dict):
+def google_image_search(driver, image_url):
+    """
+    Obtains the caption of an image with a Google image search in a new tab, unless
+    Google has been failing and its circuit breaker is open.
+
+    Parameters
+    ----------
+    driver: the selenium driver used to open the webpage and start the test.
+    image_url: str, the url of the image.
+
+    Returns
+    -------
+    The caption, or None if the image search is unavailable or failed.
+
+    """
+    image_search_breaker = driving_theory.host_circuit_breaker("www.google.com")
+    if not image_search_breaker.allow():
+        logging.info("The image search is unavailable, skipping it")
+        return None
+
+    logging.info("No caption found for the image, opening a new tab")
+    # Make a new tab
+    driving_theory.ImageSearch().new_tab(driver=driver)
+
+    # Switch control to the new tab opened
+    logging.info("Switching control to new tab")
+    driving_theory.ImageSearch().switch_tab(driver=driver)
+
+    # Open Google Image Search in the new tab
+    logging.info("Performing Google search")
+    driver.get("https://www.google.com/imghp?hl=EN")
+
+    # Accept the cookies
+    try:
+        logging.info("Accepting the cookies")
+        accept_button_xpath = '//*[@id="L2AGLb"]'
+        driving_theory.ImageSearch().accept_google_search_cookies(
+            driver=driver, accept_button_xpath=accept_button_xpath, wait_time=1
+        )
+    except:
+        logging.info("Looks like the cookies have already been accepted, continuing")
+        # Note that if an exception is returned, it means that
+        # cookies are already accepted
+        pass
+
+    # Search for the image and obtain an answer
+    logging.info("Searching for the answer to the image")
+    cam_button_xpath = '//*[@id="sbtc"]/div/div[3]/div[2]/span'
+    url_tab_xpath = '//*[@id="dRSWfb"]/div/div'
+    image_url_id = "Ycyxxc"
+    search_button_id = "RZJ9Ub"
+    first_answer_xpath = '//*[@id="topstuff"]/div/div[2]/a'
+    caption = None
+    try:
+        caption = driving_theory.ImageSearch().image_search(
+            driver=driver,
+            image_url_path=image_url,
+            cam_button_xpath=cam_button_xpath,
+            url_tab_xpath=url_tab_xpath,
+            image_url_id=image_url_id,
+            search_button_id=search_button_id,
+            first_answer_xpath=first_answer_xpath,
+        )
+        # The image search drives a browser, so it is always slower than the
+        # slow call threshold of a request; only its errors count
+        image_search_breaker.record_success()
+    except Exception as e:
+        image_search_breaker.record_failure()
+        logging.info(f"The image search failed: {e}")
+
+    # Close the tab opened
+    logging.info("Closing the tab")
+    driving_theory.ImageSearch().close_tab(driver=driver)
+
+    # Switch back control to the original tab
+    logging.info("Giving back control to the original tab")
+    driving_theory.ImageSearch().switch_to_original_tab(driver=driver)
+
+    return caption
+
+
+def evaluate_all_pages(
+    driver,
+    sign_bank,
+    sign_meaning_cache=None,
+    knowledge_base=None,
+    answer_store=None,
+    ranker=None,
+):
     """
     Evaluates all the pages in the driving test using the evaluate_per_page func.
     Uses recursion to keep on evaluating pages until there is none left to evaluate.
@@ -243,7 +269,11 @@ def evaluate_all_pages(driver, highway_code_image_dict: dict):
     Parameters
     ----------
     driver: the selenium driver used to open the webpage and start the test.
-    highway_code_image_dict: dict, a dict of Highway Code images.
+    sign_bank: SignBank, the bank of Highway Code images.
+    sign_meaning_cache: SignMeaningCache, a cache of previously identified signs.
+    knowledge_base: HighwayCodeIndex, a local index of the Highway Code text.
+    answer_store: AnswerStore, a store of previous answers.
+    ranker: SemanticRanker, if given, ranks the choices by word vectors.
 
     Returns
     -------
@@ -252,7 +282,12 @@ def evaluate_all_pages(driver, highway_code_image_dict: dict):
     """
     # Evaluate the page
     evaluate_per_page(
-        driver, highway_code_image_dict=highway_code_image_dict
+        driver,
+        sign_bank=sign_bank,
+        sign_meaning_cache=sign_meaning_cache,
+        knowledge_base=knowledge_base,
+        answer_store=answer_store,
+        ranker=ranker,
     )
 
     # Go onto next page
@@ -262,14 +297,253 @@ def evaluate_all_pages(driver, highway_code_image_dict: dict):
     )
 
     # Recursively complete all pages
-    evaluate_all_pages(driver, highway_code_image_dict)
+    evaluate_all_pages(
+        driver, sign_bank, sign_meaning_cache, knowledge_base, answer_store, ranker
+    )
 
 
-def complete_theory_test():
+def load_sign_bank(highway_code_url: str, sign_bank_path: str = None):
+    """
+    Loads the bank of Highway Code images. If a bank has been saved to the
+    sign_bank_path param and still matches the live page it is memory-mapped
+    from disk; otherwise it is built from the Highway Code website and, if a path is
+    given, saved there for later runs.
+
+    Parameters
+    ----------
+    highway_code_url: str, the url of the Highway Code page with the images.
+    sign_bank_path: str, the directory of a bank saved with build_bank.
+
+    Returns
+    -------
+    A SignBank.
+
+    """
+    downloader = driving_theory.Downloader()
+
+    if sign_bank_path:
+        if os.path.exists(os.path.join(sign_bank_path, "manifest.json")):
+            logging.info("Opening the saved image bank")
+            try:
+                sign_bank = driving_theory.ImageComparison().load_sign_bank(
+                    path=sign_bank_path
+                )
+                if not sign_bank.is_stale(url=highway_code_url, downloader=downloader):
+                    return sign_bank
+                logging.info("The saved image bank is stale, rebuilding it")
+            except ValueError as e:
+                logging.info(e)
+        else:
+            logging.info("Making an image bank of Highway Code images and saving it")
+
+        return driving_theory.ImageComparison().build_sign_bank(
+            url=highway_code_url, path=sign_bank_path, downloader=downloader
+        )
+
+    # Make an image bank of the highway code images
+    logging.info("Making an image bank of Highway Code images")
+    highway_code_image_dict = (
+        driving_theory.ImageComparison().make_highway_code_image_dict(
+            url=highway_code_url, downloader=downloader
+        )
+    )
+
+    # Load every image in the bank once, rather than once per question
+    logging.info("Loading the Highway Code images into memory")
+    return driving_theory.SignBank(
+        highway_code_image_dict=highway_code_image_dict,
+        downloader=downloader,
+        source_url=highway_code_url,
+    )
+
+
+def build_bank(sign_bank_path: str):
+    """
+    Builds the bank of Highway Code images and saves it to disk, so that later
+    runs of the test can open it in milliseconds, then checks SIGN_MATCH_THRESHOLD
+    against the images of the bank.
+
+    Parameters
+    ----------
+    sign_bank_path: str, the directory to save the bank to.
+
+    Returns
+    -------
+
+    """
+    sign_bank = driving_theory.ImageComparison().build_sign_bank(
+        url=HIGHWAY_CODE_URL, path=sign_bank_path
+    )
+    print(f"Saved {len(sign_bank)} images to {sign_bank_path}")
+
+    # Check that the threshold gives the same captions on the canonical size
+    disagreements = sign_bank.check_threshold()
+    for disagreement in disagreements:
+        print(f"Matched differently on the canonical size: {disagreement}")
+    print(
+        f"{len(disagreements)} pairs of images are matched differently at the "
+        f"threshold {driving_theory.SIGN_MATCH_THRESHOLD}"
+    )
+
+
+def load_knowledge_base(knowledge_base_path: str = KNOWLEDGE_BASE_PATH):
+    """
+    Loads the local index of the Highway Code text. If an index has been saved to
+    the knowledge_base_path param and is not stale it is opened; otherwise the
+    Highway Code is indexed and saved there for later runs.
+
+    Parameters
+    ----------
+    knowledge_base_path: str, the JSON file of a saved index.
+
+    Returns
+    -------
+    A HighwayCodeIndex.
+
+    """
+    knowledge_base_path = knowledge_base_path or KNOWLEDGE_BASE_PATH
+
+    if os.path.exists(knowledge_base_path):
+        logging.info("Opening the saved Highway Code index")
+        try:
+            knowledge_base = driving_theory.HighwayCodeIndex.load(knowledge_base_path)
+            if not knowledge_base.is_stale():
+                return knowledge_base
+            logging.info("The saved Highway Code index is stale, indexing it again")
+        except (ValueError, KeyError) as e:
+            logging.info(f"The saved Highway Code index cannot be opened: {e}")
+
+    logging.info("Indexing the Highway Code")
+    knowledge_base = driving_theory.HighwayCodeIndex()
+    knowledge_base.ingest_highway_code()
+    knowledge_base.save(knowledge_base_path)
+
+    return knowledge_base
+
+
+def load_semantic_ranker(embeddings_path: str, sign_bank, knowledge_base):
+    """
+    Loads the ranker of the semantic strategy. The embeddings of the sign bank
+    captions and the Highway Code passages are opened from the embeddings_path
+    param if saved there, and any missing ones are computed and saved.
+
+    Parameters
+    ----------
+    embeddings_path: str, the directory of the saved embeddings.
+    sign_bank: SignBank, the bank of Highway Code images.
+    knowledge_base: HighwayCodeIndex, the local index of the Highway Code text.
+
+    Returns
+    -------
+    A SemanticRanker.
+
+    """
+    if embeddings_path and os.path.exists(
+        os.path.join(embeddings_path, "texts.json")
+    ):
+        logging.info("Opening the saved embeddings")
+        ranker = driving_theory.SemanticRanker.load(embeddings_path)
+    else:
+        ranker = driving_theory.SemanticRanker()
+
+    known = len(ranker.rows)
+    ranker.precompute(texts=list(sign_bank.captions) + list(knowledge_base.passages))
+    if embeddings_path and len(ranker.rows) > known:
+        logging.info("Saving the embeddings")
+        ranker.save(embeddings_path)
+
+    return ranker
+
+
+def solve_questions(
+    input_path: str,
+    output_path: str,
+    sign_bank_path: str = "sign_bank",
+    knowledge_base_path: str = KNOWLEDGE_BASE_PATH,
+    answer_strategy: str = "gram",
+    embeddings_path: str = None,
+    max_workers: int = None,
+    http_cache_path: str = None,
+):
+    """
+    Answers a set of questions without a browser, eg scraped questions to answer
+    ahead of time. The sign bank and the Highway Code index are saved to disk first,
+    so that each worker process can open them rather than build them.
+
+    Parameters
+    ----------
+    input_path: str, a JSON lines file of questions, as for the func solve of the
+    BatchSolver class.
+    output_path: str, the JSON lines file to write the answers to, as they complete.
+    sign_bank_path: str, the directory of the saved image bank.
+    knowledge_base_path: str, the JSON file of the saved Highway Code index.
+    answer_strategy: str, how the choices are ranked, 'gram' or 'semantic'.
+    embeddings_path: str, the directory of the saved embeddings of the semantic
+    strategy.
+    max_workers: int, the number of processes, by default one per core.
+    http_cache_path: str, the directory of an HTTP cache shared by the workers.
+
+    Returns
+    -------
+    An int with the number of questions answered.
+
+    """
+    sign_bank = load_sign_bank(
+        highway_code_url=HIGHWAY_CODE_URL, sign_bank_path=sign_bank_path
+    )
+    if not os.path.exists(os.path.join(sign_bank_path, "manifest.json")):
+        sign_bank.save(sign_bank_path)
+    knowledge_base = load_knowledge_base(knowledge_base_path=knowledge_base_path)
+    if answer_strategy == "semantic" and embeddings_path:
+        load_semantic_ranker(
+            embeddings_path=embeddings_path,
+            sign_bank=sign_bank,
+            knowledge_base=knowledge_base,
+        )
+
+    count = 0
+    with open(input_path) as f_in, open(output_path, "w") as f_out:
+        records = (json.loads(line) for line in f_in if line.strip())
+        for result in driving_theory.solve_batch(
+            records,
+            sign_bank_path=sign_bank_path,
+            knowledge_base_path=knowledge_base_path,
+            embeddings_path=embeddings_path,
+            answer_strategy=answer_strategy,
+            max_workers=max_workers,
+            http_cache_path=http_cache_path,
+        ):
+            f_out.write(json.dumps(result) + "\n")
+            f_out.flush()
+            count += 1
+            if "error" in result:
+                logging.info(f"Question {result['index']} failed: {result['error']}")
+
+    return count
+
+
+def complete_theory_test(
+    sign_bank_path: str = None,
+    sign_cache_path: str = None,
+    knowledge_base_path: str = KNOWLEDGE_BASE_PATH,
+    answer_store_path: str = None,
+    answer_strategy: str = "gram",
+    embeddings_path: str = None,
+):
     """
     Completes the driving theory test from start to finish using the functions: evaluate_per_page &
     evaluate_all_pages.
 
+    Parameters
+    ----------
+    sign_bank_path: str, the directory of a bank saved with build_bank.
+    sign_cache_path: str, an SQLite file to persist identified signs between runs.
+    knowledge_base_path: str, the JSON file of a saved Highway Code index.
+    answer_store_path: str, the SQLite file of the store of previous answers.
+    answer_strategy: str, how the choices are ranked, 'gram' or 'semantic'.
+    embeddings_path: str, the directory of the saved embeddings of the semantic
+    strategy.
+
     Returns
     -------
     Hopefully a passmark for the driving theory test.
@@ -283,23 +557,45 @@ def complete_theory_test():
     logger_filepath = '/Users/aniruddha.sengupta/Desktop/Driving_Theory/logs'
     driving_theory.Logging().create_logging_config(filepath=logger_filepath)
 
-    # Make an image bank of the highway code images
-    logging.info("Making an image bank of Highway Code images")
-    highway_code_url = "https://www.gov.uk/guidance/the-highway-code/traffic-signs"
-    highway_code_image_dict = (
-        driving_theory.ImageComparison().make_highway_code_image_dict(
-            url=highway_code_url
-        )
+    # Load the language resources while the image bank is loading
+    driving_theory.warmup(background=True)
+
+    # Load the image bank of the highway code images
+    sign_bank = load_sign_bank(
+        highway_code_url=HIGHWAY_CODE_URL, sign_bank_path=sign_bank_path
     )
+    sign_meaning_cache = driving_theory.SignMeaningCache(path=sign_cache_path)
+    knowledge_base = load_knowledge_base(knowledge_base_path=knowledge_base_path)
+    answer_store = None
+    if answer_store_path:
+        answer_store = driving_theory.AnswerStore(path=answer_store_path)
+    ranker = None
+    if answer_strategy == "semantic":
+        ranker = load_semantic_ranker(
+            embeddings_path=embeddings_path,
+            sign_bank=sign_bank,
+            knowledge_base=knowledge_base,
+        )
 
     # Start the test
     logging.info('Starting the test')
     driver = driving_theory.StartTest().open_webpage(url=url, start_xpath=start_xpath)
 
     try:
-        evaluate_all_pages(driver, highway_code_image_dict)
+        evaluate_all_pages(
+            driver,
+            sign_bank,
+            sign_meaning_cache,
+            knowledge_base,
+            answer_store,
+            ranker,
+        )
     except:
         logging.info('The test has now ended')
+        logging.info(sign_meaning_cache.stats())
+        if driving_theory.http_cache is not None:
+            logging.info(driving_theory.http_cache.stats())
+        logging.info(driving_theory.shared_latency_tracker().stats())
 
 
 def main():
@@ -307,7 +603,94 @@ def main():
     The main function.
 
     """
-    complete_theory_test()
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        "command",
+        nargs="?",
+        default="test",
+        choices=[
+            "test",
+            "build-bank",
+            "import-answers",
+            "export-answers",
+            "solve",
+            "benchmark-snippets",
+        ],
+    )
+    arg_parser.add_argument("path", nargs="?", default=None)
+    arg_parser.add_argument("--sign-bank", default=None)
+    arg_parser.add_argument("--sign-cache", default=None)
+    arg_parser.add_argument("--knowledge-base", default=None)
+    arg_parser.add_argument("--answer-store", default=None)
+    arg_parser.add_argument(
+        "--answer-strategy", default="gram", choices=["gram", "semantic"]
+    )
+    arg_parser.add_argument("--embeddings", default=None)
+    arg_parser.add_argument("--output", default="answers.jsonl")
+    arg_parser.add_argument("--workers", type=int, default=None)
+    arg_parser.add_argument("--http-cache", default=None)
+    args = arg_parser.parse_args()
+    if args.path is None and args.command in (
+        "import-answers",
+        "export-answers",
+        "solve",
+        "benchmark-snippets",
+    ):
+        arg_parser.error(f"the {args.command} command needs a path")
+
+    # Put the HTTP cache under every request, if a path is given
+    if args.http_cache:
+        driving_theory.use_http_cache(path=args.http_cache)
+
+    if args.command == "build-bank":
+        build_bank(sign_bank_path=args.sign_bank or "sign_bank")
+    elif args.command == "import-answers":
+        answer_store = driving_theory.AnswerStore(
+            path=args.answer_store or "answers.db"
+        )
+        print(f"Imported {answer_store.import_file(path=args.path)} answers")
+    elif args.command == "export-answers":
+        answer_store = driving_theory.AnswerStore(
+            path=args.answer_store or "answers.db"
+        )
+        print(f"Exported {answer_store.export_file(path=args.path)} answers")
+    elif args.command == "solve":
+        count = solve_questions(
+            input_path=args.path,
+            output_path=args.output,
+            sign_bank_path=args.sign_bank or "sign_bank",
+            knowledge_base_path=args.knowledge_base or KNOWLEDGE_BASE_PATH,
+            answer_strategy=args.answer_strategy,
+            embeddings_path=args.embeddings,
+            max_workers=args.workers,
+            http_cache_path=args.http_cache,
+        )
+        print(f"Answered {count} questions")
+    elif args.command == "benchmark-snippets":
+        # Time the snippet extraction on a saved results page, or a directory of them
+        paths = [args.path]
+        if os.path.isdir(args.path):
+            paths = sorted(
+                os.path.join(args.path, name)
+                for name in os.listdir(args.path)
+                if name.endswith(".html")
+            )
+        for result in driving_theory.benchmark_snippet_extraction(paths=paths):
+            print(
+                f"{result['path']} ({result['bytes']} bytes): "
+                f"{result['dom_seconds'] * 1000:.1f}ms with requests_html, "
+                f"{result['stream_seconds'] * 1000:.1f}ms streamed, "
+                f"same snippet: {result['same_snippet']}"
+            )
+    else:
+        complete_theory_test(
+            sign_bank_path=args.sign_bank,
+            sign_cache_path=args.sign_cache,
+            knowledge_base_path=args.knowledge_base,
+            answer_store_path=args.answer_store,
+            answer_strategy=args.answer_strategy,
+            embeddings_path=args.embeddings,
+        )
 
 
 # Execution
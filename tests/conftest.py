@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# The modules live in code/, which is not a package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "code"))
+
+import driving_theory  # noqa: E402
+
+
+@pytest.fixture
+def text_pipeline():
+    """
+    The shared TextPipeline, skipping the test if spaCy or the NLTK corpora it needs
+    are not installed and cannot be downloaded.
+
+    """
+    try:
+        return driving_theory.shared_text_pipeline()
+    except (ImportError, LookupError, OSError) as e:
+        pytest.skip(f"The text pipeline is not available: {e}")
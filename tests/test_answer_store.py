@@ -0,0 +1,113 @@
+import pytest
+
+import driving_theory
+
+# Questions are shingled with the tokenizer of the shared TextPipeline
+pytestmark = pytest.mark.usefixtures("text_pipeline")
+
+CHOICES = ["30mph", "50mph", "60mph", "70mph"]
+
+
+def make_store(tmp_path, question, answer="70mph", correct=True):
+    answer_store = driving_theory.AnswerStore(path=str(tmp_path / "answers.db"))
+    answer_store.record(
+        question=question,
+        choices=CHOICES,
+        answer=answer,
+        method="web_search",
+        correct=correct,
+    )
+    return answer_store
+
+
+def test_lookup_similar_replays_a_reworded_question(tmp_path):
+    answer_store = make_store(
+        tmp_path, "What is the national speed limit for cars on a motorway?"
+    )
+
+    stored = answer_store.lookup_similar(
+        question="What's the national speed limit for cars on a motorway",
+        choices=list(reversed(CHOICES)),
+    )
+
+    assert stored is not None
+    assert stored["answer"] == "70mph"
+    assert stored["similarity"] >= 0.9
+    assert answer_store.replayable(stored=stored)
+
+
+def test_lookup_similar_matches_reordered_clauses(tmp_path):
+    answer_store = make_store(
+        tmp_path,
+        "What should you do when you see a flashing amber light, if it is safe?",
+        answer="50mph",
+    )
+
+    stored = answer_store.lookup_similar(
+        question=(
+            "If it is safe, what should you do when you see a flashing amber light?"
+        ),
+        choices=CHOICES,
+    )
+
+    assert stored is not None
+    assert stored["answer"] == "50mph"
+
+
+def test_lookup_similar_does_not_match_dual_and_single_carriageways(tmp_path):
+    # Regression: these differ by one word, and have different answers
+    answer_store = make_store(
+        tmp_path,
+        "What is the national speed limit on a dual carriageway for cars towing "
+        "caravans or trailers?",
+    )
+
+    stored = answer_store.lookup_similar(
+        question=(
+            "What is the national speed limit on a single carriageway for cars "
+            "towing caravans or trailers?"
+        ),
+        choices=CHOICES,
+    )
+
+    assert stored is None
+
+
+def test_lookup_similar_does_not_match_a_negated_question(tmp_path):
+    answer_store = make_store(
+        tmp_path, "When should you use your hazard warning lights on a motorway?"
+    )
+
+    stored = answer_store.lookup_similar(
+        question="When should you not use your hazard warning lights on a motorway?",
+        choices=CHOICES,
+    )
+
+    assert stored is None
+
+
+def test_lookup_similar_needs_the_same_context(tmp_path):
+    answer_store = make_store(
+        tmp_path, "What is the national speed limit for cars on a motorway?"
+    )
+
+    stored = answer_store.lookup_similar(
+        question="What is the national speed limit for cars on a motorway?",
+        choices=CHOICES,
+        context="image",
+    )
+
+    assert stored is None
+
+
+def test_unverified_answers_are_not_replayed(tmp_path):
+    question = "What is the national speed limit for cars on a motorway?"
+    answer_store = make_store(tmp_path, question, correct=None)
+
+    stored = answer_store.lookup_similar(question=question, choices=CHOICES)
+    assert stored is not None
+    assert not answer_store.replayable(stored=stored)
+
+    answer_store.mark(question=question, choices=CHOICES, correct=True)
+    stored = answer_store.lookup_similar(question=question, choices=CHOICES)
+    assert answer_store.replayable(stored=stored)
@@ -0,0 +1,111 @@
+import pytest
+
+import driving_theory
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces time.monotonic in the module with a clock that only moves when told to.
+
+    """
+
+    class Clock:
+        now = 100.0
+
+        def monotonic(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(driving_theory.time, "monotonic", clock.monotonic)
+
+    return clock
+
+
+def make_breaker():
+    return driving_theory.CircuitBreaker(
+        host="example.com", failure_threshold=3, slow_call_seconds=5.0, reset_timeout=30
+    )
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = make_breaker()
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.is_open()
+    assert not breaker.allow()
+
+
+def test_a_success_resets_the_failures(clock):
+    breaker = make_breaker()
+
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success(seconds=0.1)
+    for _ in range(2):
+        breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = make_breaker()
+
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_success(seconds=6.0)
+
+    assert breaker.state == "open"
+
+
+def test_half_open_allows_one_trial_call(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 30
+    assert not breaker.is_open()
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only the trial call is let through
+    assert breaker.is_open()
+    assert not breaker.allow()
+
+    breaker.record_success(seconds=0.1)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_a_failed_trial_call_opens_the_breaker_again(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_a_released_trial_call_lets_another_through(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+
+    assert breaker.state == "half_open"
+    assert breaker.allow()
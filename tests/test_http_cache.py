@@ -0,0 +1,144 @@
+import pytest
+import requests
+
+import driving_theory
+
+
+class FakeSession:
+    """
+    Answers requests from a dict of urls to (status code, body, headers), recording
+    the headers of every request.
+
+    """
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        status_code, body, response_headers = self.pages[url]
+
+        response = requests.Response()
+        response.url = url
+        response.status_code = status_code
+        response._content = body
+        response.headers.update(response_headers)
+
+        return response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces time.time in the module with a clock that only moves when told to.
+
+    """
+
+    class Clock:
+        now = 1_000_000.0
+
+        def time(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(driving_theory.time, "time", clock.time)
+
+    return clock
+
+
+def test_fresh_entries_are_served_without_a_request(tmp_path, clock):
+    url = "https://www.gov.uk/guidance/the-highway-code"
+    session = FakeSession({url: (200, b"rules", {"Content-Type": "text/html"})})
+    cache = driving_theory.HTTPCache(path=str(tmp_path))
+
+    assert cache.get(session=session, url=url).content == b"rules"
+    clock.now += 60
+    assert cache.get(session=session, url=url).content == b"rules"
+
+    assert len(session.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entries_are_revalidated_with_their_etag(tmp_path, clock):
+    url = "https://example.com/page"
+    session = FakeSession({url: (200, b"page", {"ETag": '"v1"'})})
+    cache = driving_theory.HTTPCache(path=str(tmp_path), ttls={}, default_ttl=10)
+    cache.get(session=session, url=url)
+
+    clock.now += 11
+    session.pages[url] = (304, b"", {})
+    response = cache.get(session=session, url=url)
+
+    assert response.content == b"page"
+    assert session.requests[-1][1]["If-None-Match"] == '"v1"'
+    assert cache.stats()["revalidations"] == 1
+
+    # A revalidated entry is fresh again
+    clock.now += 5
+    cache.get(session=session, url=url)
+    assert len(session.requests) == 2
+
+
+def test_changed_entries_are_replaced(tmp_path, clock):
+    url = "https://example.com/page"
+    session = FakeSession(
+        {url: (200, b"old", {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})}
+    )
+    cache = driving_theory.HTTPCache(path=str(tmp_path), ttls={}, default_ttl=10)
+    cache.get(session=session, url=url)
+
+    clock.now += 11
+    session.pages[url] = (200, b"new", {})
+
+    assert cache.get(session=session, url=url).content == b"new"
+    assert "If-Modified-Since" in session.requests[-1][1]
+    clock.now += 1
+    assert cache.get(session=session, url=url).content == b"new"
+    assert len(session.requests) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    pages = {
+        f"https://example.com/{name}": (200, name.encode() * 4, {}) for name in "abc"
+    }
+    session = FakeSession(pages)
+    cache = driving_theory.HTTPCache(path=str(tmp_path), max_bytes=8)
+
+    cache.get(session=session, url="https://example.com/a")
+    clock.now += 1
+    cache.get(session=session, url="https://example.com/b")
+    clock.now += 1
+    # Using a makes b the least recently used
+    cache.get(session=session, url="https://example.com/a")
+    clock.now += 1
+    cache.get(session=session, url="https://example.com/c")
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= 8
+
+    cache.get(session=session, url="https://example.com/a")
+    cache.get(session=session, url="https://example.com/b")
+    assert [url for url, _ in session.requests].count("https://example.com/a") == 1
+    assert [url for url, _ in session.requests].count("https://example.com/b") == 2
+
+
+def test_redirects_to_another_host_are_not_stored(tmp_path, clock):
+    url = "https://www.google.co.uk/search?q=speed"
+    session = FakeSession({url: (200, b"consent", {})})
+    cache = driving_theory.HTTPCache(path=str(tmp_path))
+
+    original_get = session.get
+
+    def redirected_get(url, headers=None, timeout=None):
+        response = original_get(url, headers=headers, timeout=timeout)
+        response.url = "https://consent.google.co.uk/"
+        return response
+
+    session.get = redirected_get
+    cache.get(session=session, url=url)
+    cache.get(session=session, url=url)
+
+    assert len(session.requests) == 2
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,70 @@
+import random
+import re
+
+import driving_theory
+
+
+def test_bk_tree_finds_the_same_neighbours_as_a_linear_scan():
+    rng = random.Random(0)
+    index = driving_theory.PerceptualHashIndex()
+    # Few distinct hashes, so that some items share a node
+    hashes = [rng.getrandbits(64) for _ in range(150)]
+    hashes += rng.sample(hashes, 50)
+    for item_id, image_hash in enumerate(hashes):
+        index.add(image_hash=image_hash, item_id=item_id)
+
+    assert len(index) == len(hashes)
+
+    for _ in range(50):
+        query = rng.getrandbits(64)
+        if rng.random() < 0.3:
+            # Near an indexed hash
+            query = rng.choice(hashes) ^ (1 << rng.randrange(64))
+        distances = sorted(
+            index.hamming_distance(query, image_hash) for image_hash in hashes
+        )
+
+        for k, max_distance in [(1, 64), (5, 64), (10, 30)]:
+            results = index.query(image_hash=query, k=k, max_distance=max_distance)
+
+            expected = [d for d in distances[:k] if d <= max_distance]
+            assert [distance for _, distance in results] == expected
+            for item_id, distance in results:
+                assert index.hamming_distance(query, hashes[item_id]) == distance
+
+
+def test_bk_tree_of_no_hashes_finds_nothing():
+    assert driving_theory.PerceptualHashIndex().query(image_hash=0) == []
+
+
+def test_pattern_matcher_counts_as_re_findall():
+    rng = random.Random(0)
+    for _ in range(200):
+        patterns = [
+            "".join(rng.choice("ab ") for _ in range(rng.randint(1, 4)))
+            for _ in range(rng.randint(1, 6))
+        ]
+        text = "".join(rng.choice("ab ") for _ in range(rng.randint(0, 60)))
+        matcher = driving_theory.PatternMatcher(patterns)
+
+        assert matcher.count(text) == {
+            pattern: len(re.findall(re.escape(pattern), text))
+            for pattern in matcher.patterns
+        }
+        assert matcher.count(text, whole_words=True) == {
+            pattern: len(re.findall(rf"(?<!\w){re.escape(pattern)}(?!\w)", text))
+            for pattern in matcher.patterns
+        }
+        assert matcher.contains(text) == any(
+            pattern in text for pattern in matcher.patterns
+        )
+
+
+def test_pattern_matcher_finds_every_occurrence():
+    matcher = driving_theory.PatternMatcher(["he", "she", "his", "hers"])
+
+    assert sorted(matcher.matches("ushers")) == [
+        ("he", 2, 4),
+        ("hers", 2, 6),
+        ("she", 1, 4),
+    ]
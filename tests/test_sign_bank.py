@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import driving_theory
+
+
+class FakeDownloader:
+    """
+    Serves images from memory in place of the Highway Code website.
+
+    """
+
+    max_workers = 4
+
+    def __init__(self, images: dict):
+        self.images = images
+
+    def fetch_images(self, image_urls: list) -> dict:
+        return {url: self.images[url] for url in image_urls if url in self.images}
+
+
+def random_image(rng, size=(128, 128)):
+    width, height = size
+    return Image.fromarray(
+        rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8), "RGB"
+    )
+
+
+@pytest.fixture
+def images():
+    rng = np.random.default_rng(0)
+    return {f"https://example.com/sign{i}.png": random_image(rng) for i in range(6)}
+
+
+@pytest.fixture
+def sign_bank(images):
+    return driving_theory.SignBank(
+        highway_code_image_dict={url: f"Sign {i}" for i, url in enumerate(images)},
+        downloader=FakeDownloader(images),
+    )
+
+
+def test_batch_scores_match_image_comparison(images, sign_bank):
+    # At the canonical size, the vectorised MAD is the score of image_comparison
+    rng = np.random.default_rng(1)
+    test = random_image(rng)
+
+    scores = driving_theory.ImageComparison().batch_image_comparison(
+        test_array=driving_theory.ImageComparison().to_canonical_array(
+            image=test, image_size=sign_bank.image_size
+        ),
+        image_array=sign_bank.image_array,
+        chunk_size=4,
+    )
+    expected = [
+        driving_theory.ImageComparison().image_comparison(test, images[url])
+        for url in sign_bank.image_urls
+    ]
+
+    np.testing.assert_allclose(scores, expected, rtol=1e-9)
+
+
+def test_score_matrix_matches_batch_scores(images, sign_bank):
+    tests = list(images.values())[:3]
+
+    scores = driving_theory.ImageComparison().sign_meaning_matrix(
+        sign_bank=sign_bank, tests=tests + [None]
+    )
+
+    for i, test in enumerate(tests):
+        np.testing.assert_allclose(
+            scores[i],
+            driving_theory.ImageComparison().batch_image_comparison(
+                test_array=np.asarray(test), image_array=sign_bank.image_array
+            ),
+        )
+        assert scores[i].argmin() == i
+        assert scores[i, i] == 0.0
+    assert np.isinf(scores[3]).all()
+
+
+def test_shared_sign_bank_is_built_once_per_dict(images, sign_bank, monkeypatch):
+    monkeypatch.setattr(driving_theory, "sign_banks", driving_theory.OrderedDict())
+    highway_code_image_dict = sign_bank.to_dict()
+    monkeypatch.setattr(
+        driving_theory,
+        "Downloader",
+        lambda *args, **kwargs: FakeDownloader(images),
+    )
+
+    first = driving_theory.shared_sign_bank(highway_code_image_dict)
+    second = driving_theory.shared_sign_bank(dict(highway_code_image_dict))
+
+    assert first is second
+    assert driving_theory.shared_sign_bank(sign_bank) is sign_bank